@@ -0,0 +1,128 @@
+import datetime
+import json
+import os
+import time
+
+from binary_month import BinaryMonth, binary_path
+from storage import write_atomic
+from timesheet_store import MonthSheet
+
+
+class AggregateIndex:
+    # Seconds worked per day and per project totals for every stored month,
+    # kept in a single sidecar file so that overviews spanning many months
+    # don't open every month file. Months are updated from the store whenever
+    # they are saved, and re-read from storage when their files changed after
+    # the index recorded them. The totals of every project over all months are
+    # adjusted as months are updated. A month with a .hmonth file at least as
+    # new as its JSON files is re-read from that, without parsing any notes.
+    def __init__(self, storage, filename="hours-index.json"):
+        self.storage = storage
+        self.path = os.path.join(storage.directory, filename)
+        self.months = None
+        self.project_totals = {}
+        self.dirty = False
+        self.refreshed = False
+
+    def load(self):
+        self.months = {}
+        self.project_totals = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    months = json.load(f)["months"]
+            except (ValueError, KeyError):
+                months = {}  # rebuilt below
+            for key, entry in months.items():
+                if len(entry) != 3:
+                    continue  # written before projects, re-read on refresh
+                year, month = key.split("-")
+                self.months[(int(year), int(month))] = tuple(entry)
+                self.add_project_totals(entry[2], 1)
+
+    def ensure_loaded(self):
+        if self.months is None:
+            self.load()
+
+    def refresh(self):
+        # re-read the months whose files are newer than the index
+        self.ensure_loaded()
+        for year, month in self.storage.stored_months():
+            entry = self.months.get((year, month))
+            mtime = self.storage.month_mtime(year, month)
+            if entry is None or mtime > entry[0]:
+                if not self.read_binary(year, month, mtime):
+                    sheet = MonthSheet(year, month)
+                    sheet.load(self.storage.read_month(year, month))
+                    self.update_month(sheet)
+        self.refreshed = True
+
+    def read_binary(self, year, month, mtime):
+        # whether the month could be updated from an up to date .hmonth file
+        path = binary_path(self.storage.directory, year, month)
+        try:
+            if os.path.getmtime(path) < mtime:
+                return False
+            with BinaryMonth(path) as binary:
+                # -1 marks days without an entry
+                projects = {
+                    name: sum(max(seconds, 0) for seconds in binary.project_seconds(name)) for name in binary.projects
+                }
+                self.set_month(year, month, list(binary.totals), projects)
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def update_month(self, sheet):
+        self.set_month(sheet.year, sheet.month, list(sheet.seconds), sheet.project_totals())
+
+    def set_month(self, year, month, seconds, projects):
+        self.ensure_loaded()
+        previous = self.months.get((year, month))
+        if previous is not None:
+            self.add_project_totals(previous[2], -1)
+        projects = {name: total for name, total in projects.items() if total}
+        self.add_project_totals(projects, 1)
+        self.months[(year, month)] = (time.time(), seconds, projects)
+        self.dirty = True
+
+    def add_project_totals(self, projects, sign):
+        for name, seconds in projects.items():
+            total = self.project_totals.get(name, 0) + sign * seconds
+            if total:
+                self.project_totals[name] = total
+            else:
+                self.project_totals.pop(name, None)
+
+    def save(self):
+        if self.dirty:
+            months = {f"{year}-{month}": entry for (year, month), entry in self.months.items()}
+            write_atomic(self.path, {"months": months})
+            self.dirty = False
+
+    def month_seconds(self, year, month):
+        if not self.refreshed:
+            self.refresh()
+        entry = self.months.get((year, month))
+        return entry[1] if entry is not None else []
+
+    def project_total(self, project):
+        if not self.refreshed:
+            self.refresh()
+        return self.project_totals.get(project, 0)
+
+    def project_names(self):
+        if not self.refreshed:
+            self.refresh()
+        return sorted(self.project_totals)
+
+    def year_days(self, year):
+        # (date, seconds) for every day of the year
+        days = []
+        for month in range(1, 13):
+            seconds = self.month_seconds(year, month)
+            first = datetime.date(year, month, 1)
+            next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+            for index in range((next_month - first).days):
+                days.append((first + datetime.timedelta(days=index), seconds[index] if index < len(seconds) else 0))
+        return days
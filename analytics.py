@@ -0,0 +1,125 @@
+import calendar
+import datetime
+
+from durations import format_duration
+from storage import months_between
+
+
+def format_balance(seconds):
+    return ("-" if seconds < 0 else "+") + format_duration(abs(int(seconds)))
+
+
+class Analytics:
+    # Expected hours (working days × max_hours), the overtime balance, rolling
+    # averages and streaks over any range of days, computed with NumPy from
+    # the seconds worked per day over all projects. month_seconds(year, month)
+    # supplies those, e.g. AggregateIndex.month_seconds. The arrays of a month
+    # are cached until month_saved() is called for it, e.g. as a save listener
+    # of the store, or until the settings change. Days after today are left
+    # out, so the current month doesn't count the days still to come.
+    #
+    # NumPy is only imported when the first instance is created, like
+    # matplotlib by HoursGraph.
+    def __init__(self, month_seconds, max_hours=8, weekend_days=(5, 6), today=datetime.date.today):
+        import numpy as np
+
+        self.np = np
+        self.month_seconds = month_seconds
+        self.max_hours = max_hours
+        self.weekend_days = sorted(weekend_days)
+        self.today = today
+        self.months = {}
+
+    def set_settings(self, max_hours, weekend_days):
+        if max_hours != self.max_hours or sorted(weekend_days) != self.weekend_days:
+            self.max_hours = max_hours
+            self.weekend_days = sorted(weekend_days)
+            self.months.clear()
+
+    def month_saved(self, sheet):
+        self.months.pop((sheet.year, sheet.month), None)
+
+    def month_arrays(self, year, month):
+        # seconds worked, whether it is a working day and whether max_hours
+        # were reached on it, for each day of the month
+        key = (year, month)
+        if key not in self.months:
+            np = self.np
+            first_weekday, days = calendar.monthrange(year, month)
+            worked = np.zeros(days, dtype=np.int64)
+            seconds = self.month_seconds(year, month)[:days]
+            worked[: len(seconds)] = seconds
+            working = ~np.isin((first_weekday + np.arange(days)) % 7, self.weekend_days)
+            reached = working & (worked >= self.max_hours * 3600)
+            self.months[key] = (worked, working, reached)
+        return self.months[key]
+
+    def days(self, first, last):
+        # the arrays of month_arrays for the days from first to last inclusive
+        np = self.np
+        columns = ([], [], [])
+        for year, month in months_between(first, last):
+            arrays = self.month_arrays(year, month)
+            start = first.day - 1 if (year, month) == (first.year, first.month) else 0
+            end = last.day if (year, month) == (last.year, last.month) else len(arrays[0])
+            for column, array in zip(columns, arrays):
+                column.append(array[start:end])
+        if not columns[0]:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool), np.zeros(0, dtype=bool)
+        return tuple(np.concatenate(column) for column in columns)
+
+    def rolling_average(self, first, last, window):
+        # seconds per day over the window days up to each day from first to last
+        np = self.np
+        worked = self.days(first - datetime.timedelta(days=window - 1), min(last, self.today()))[0]
+        sums = np.concatenate(([0], np.cumsum(worked)))
+        return (sums[window:] - sums[:-window]) / window
+
+    def longest_run(self, mask):
+        np = self.np
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.view(np.int8), [0]))))
+        return int((edges[1::2] - edges[::2]).max()) if len(edges) else 0
+
+    def current_run(self, mask):
+        breaks = self.np.flatnonzero(~mask)
+        return len(mask) - int(breaks[-1]) - 1 if len(breaks) else len(mask)
+
+    def summary(self, first, last):
+        # figures for the days from first to last inclusive, up to today
+        last = min(last, self.today())
+        worked, working, reached = self.days(first, last)
+        working_days = int(working.sum())
+        total = int(worked.sum())
+        expected = working_days * self.max_hours * 3600
+        # streaks count working days, days off neither extend nor break them
+        logged = worked[working] > 0
+        reached = reached[working]
+        return {
+            "first": first,
+            "last": last,
+            "worked": total,
+            "working_days": working_days,
+            "expected": expected,
+            "balance": total - expected,
+            "average": total / working_days if working_days else 0,
+            "last_7_days": float(self.rolling_average(last, last, 7)[-1]) if first <= last else 0,
+            "last_30_days": float(self.rolling_average(last, last, 30)[-1]) if first <= last else 0,
+            "streak": self.current_run(logged),
+            "longest_streak": self.longest_run(logged),
+            "target_streak": self.current_run(reached),
+            "longest_target_streak": self.longest_run(reached),
+        }
+
+
+def summary_lines(summary, max_hours):
+    # the summary as text, for the summary panel and `cli.py summary`
+    return [
+        f"Worked {format_duration(summary['worked'])} of {format_duration(summary['expected'])} expected, "
+        f"{summary['working_days']} working days × {max_hours} h",
+        f"Overtime balance {format_balance(summary['balance'])}",
+        f"Average {summary['average'] / 3600:.1f} h per working day, "
+        f"{summary['last_7_days'] / 3600:.1f} h per day over the last 7 days, "
+        f"{summary['last_30_days'] / 3600:.1f} h over the last 30",
+        f"Streak of {summary['streak']} working days with time logged (longest {summary['longest_streak']}), "
+        f"{summary['target_streak']} reaching {max_hours} h (longest {summary['longest_target_streak']})",
+    ]
@@ -1,33 +1,49 @@
-import json
+import datetime
 import os
 import sys
+import time
 from PyQt5.QtGui import QKeyEvent
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
     QDialog,
     QWidget,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QHBoxLayout,
     QLabel,
     QPushButton,
-    QHeaderView,
     QComboBox,
+    QMessageBox,
 )
-from PyQt5.QtCore import QTimer, QDate, Qt, QTime
-import matplotlib.pyplot as plt
-import seaborn as sns
-import datetime
-
+from PyQt5.QtCore import QFileSystemWatcher, QTimer, QDate, Qt
+
+from aggregate_index import AggregateIndex
+from analytics import Analytics, format_balance, summary_lines
+from background_writer import BackgroundWriter
+from debug_dialog import DebugDialog
+from durations import format_duration
+from graph import HoursGraph
+from instrumentation import Instrumentation
+from search import NotesIndex
+from search_dialog import SearchDialog
 from settings import SettingsWindow
-from PyQt5.QtGui import QColor
+from storage import DEFAULT_PROJECT, MONTH_FILE, open_storage
+from timer_engine import IntervalJournal, TimerEngine
+from timesheet_model import RangeModel, TimesheetModel
+from timesheet_store import TimesheetStore
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, instrumentation=None):
         super().__init__()
 
+        # Optional profiling, the methods are wrapped before they are connected
+        self.instrumentation = instrumentation or Instrumentation.from_arguments([])
+        self.instrumentation.wrap(
+            self, ["update_timer", "save_data", "load_data", "populate_table", "plot_hours_worked"]
+        )
+        self.debug_dialog = None
+
         # Set window title and size
         self.setWindowTitle("Hours Tracking Dashboard")
         self.setGeometry(100, 100, 800, 600)
@@ -43,10 +59,35 @@ class MainWindow(QMainWindow):
         # Set up timer
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_timer)
+        self.timer_engine = TimerEngine()
+        self.timer_seconds = 0
+        self.timer_over_limit = False
         self.editing_today_cell = False
 
-        # Load settings
+        # Load settings, disk writes run on the background writer's thread
+        self.storage = open_storage()
+        self.writer = BackgroundWriter(self.storage)
+        self.writer.write_failed.connect(self.show_storage_error)
+        self.writer.load_failed.connect(self.show_storage_error)
         self.load_settings()
+        self.storage.flush_interval = self.flush_interval
+        self.store = TimesheetStore(self.writer, cache_size=self.month_cache_size)
+        # the timer keeps writing to today's month while others are shown
+        self.store.pinned.add((self.current_year, self.current_month))
+        self.aggregate_index = AggregateIndex(self.writer)
+        self.store.save_listeners.append(self.aggregate_index.update_month)
+        self.notes_index = NotesIndex(self.writer)
+        self.store.save_listeners.append(self.notes_index.update_month)
+        # the months in storage, read again when the file watcher reports changes
+        self.stored_months = None
+        self.store.save_listeners.append(self.month_saved)
+        self.search_dialog = None
+        # created with the summary panel, which imports NumPy
+        self.analytics = None
+        self.interval_journal = IntervalJournal(self.storage.directory)
+        # the running totals are updated by set_seconds
+        self.instrumentation.wrap(self.store, ["set_seconds"])
+        self.instrumentation.count_bytes(self.writer, ["write_pending", "flush"])
 
         # Set up UI
         self.setup_ui()
@@ -54,45 +95,59 @@ class MainWindow(QMainWindow):
         # Load saved data
         self.load_data()
 
+        # Reload months and settings that other instances change
+        self.reload_timer = QTimer()
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.timeout.connect(self.reload_changes)
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.schedule_reload)
+        self.watcher.directoryChanged.connect(self.schedule_reload)
+        self.watch_files()
+
+        # Measure how late the event loop runs a 100 ms timer
+        if self.instrumentation.enabled:
+            self.last_loop_tick = time.perf_counter()
+            self.lateness_timer = QTimer()
+            self.lateness_timer.timeout.connect(self.measure_lateness)
+            self.lateness_timer.start(100)
+
+    def measure_lateness(self):
+        now = time.perf_counter()
+        lateness = max(now - self.last_loop_tick - 0.1, 0)
+        self.instrumentation.histogram("event loop lateness").add(lateness * 1000000)
+        self.last_loop_tick = now
+
     def load_data(self):
-        filename = f"{self.selected_year}-{self.selected_month}.json"
-        if os.path.exists(filename):
-            with open(filename, "r") as f:
-                data = json.load(f)
-            for i in range(self.table.rowCount() - 1):
-                date = self.table.item(i, 0).text()
-                if date in data:
-                    time_worked = data[date]["time_worked"]
-                    notes = data[date]["notes"]
-                    self.table.item(i, 1).setText(time_worked)
-                    self.table.item(i, 2).setText(notes)
-                    # update the timer if the current day is being edited
-                    if self.current_month == self.selected_month and self.current_year == self.selected_year:
-                        if self.current_date.toString("dd/MM/yyyy") == date:
-                            self.timer_label.setText(time_worked)
-                            self.editing_today_cell = False
+        # bind the table to the selected month, read from disk on first use
+        self.populate_table()
+        # the timer continues from the time already logged today
+        today = self.store.sheet(self.current_year, self.current_month)
+        self.set_timer_seconds(today.project_seconds(self.active_project, self.current_day - 1))
+        self.editing_today_cell = False
 
     def load_settings(self):
-        if os.path.exists("settings.json"):
-            with open("settings.json", "r") as f:
-                settings = json.load(f)
-            self.max_hours = settings.get("max_hours", 8)
-            self.weekend_days = settings.get("weekend_days", [5, 6])
-        else:
-            self.max_hours = 8
-            self.weekend_days = [5, 6]
+        settings = self.writer.load_settings()
+        self.max_hours = settings.get("max_hours", 8)
+        self.weekend_days = settings.get("weekend_days", [5, 6])
+        self.flush_interval = settings.get("flush_interval", 60)
+        self.month_cache_size = settings.get("month_cache_size", 12)
+        self.idle_threshold = settings.get("idle_threshold_minutes", 5) * 60
+        self.projects = settings.get("projects", [DEFAULT_PROJECT])
+        self.active_project = settings.get("active_project", self.projects[0])
+
+    def save_projects(self):
+        settings = self.writer.load_settings()
+        settings.update(projects=self.projects, active_project=self.active_project)
+        self.writer.save_settings(settings)
 
     def save_data(self):
-        data = {}
-        for i in range(self.table.rowCount() - 1):
-            date = self.table.item(i, 0).text()
-            time_worked = self.table.item(i, 1).text()
-            notes = self.table.item(i, 2).text()
-            if time_worked or notes:
-                data[date] = {"time_worked": time_worked, "notes": notes}
-        filename = f"{self.selected_year}-{self.selected_month}.json"
-        with open(filename, "w") as f:
-            json.dump(data, f)
+        self.store.save()
+        # at most once a second while the timer runs
+        if not self.summary_label.isHidden() and not self.summary_timer.isActive():
+            self.summary_timer.start(1000)
+
+    def show_storage_error(self, message):
+        self.statusBar().showMessage(message)
 
     def setup_ui(self):
         menu_bar = self.menuBar()
@@ -103,6 +158,11 @@ class MainWindow(QMainWindow):
         settings_action = file_menu.addAction("Settings")
         settings_action.triggered.connect(self.show_settings)
 
+        # Create "Search Notes" menu item
+        search_action = file_menu.addAction("Search Notes")
+        search_action.setShortcut("Ctrl+F")
+        search_action.triggered.connect(self.show_search)
+
         # Create combo boxes for month and year selection
         self.month_combo = QComboBox()
         self.month_combo.addItems(["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"])
@@ -119,33 +179,68 @@ class MainWindow(QMainWindow):
         self.today_label.setStyleSheet("font-size: 20px; font-weight: bold;")
 
         self.timer_label = QLabel("00:00:00")
-        self.timer_label.setStyleSheet(
-            "font-size: 50px; font-weight: bold; border: 2px solid green; border-radius: 10px;"
-        )
+        self.timer_label.setStyleSheet(self.timer_style("green"))
 
         # Create button to show/hide graph
         self.show_graph_button = QPushButton("Show Graph")
         self.show_graph_button.clicked.connect(self.toggle_graph_visibility)
-
-        # Create table to display hours worked
-        self.table = QTableWidget()
-        self.table.setColumnCount(3)
-        self.table.setHorizontalHeaderLabels(["Date", "Time Worked", "Notes"])
-        self.table.horizontalHeader().setSectionResizeMode(
-            0, QHeaderView.ResizeToContents
-        )
-        self.table.horizontalHeader().setSectionResizeMode(
-            1, QHeaderView.ResizeToContents
+        self.graph_mode_combo = QComboBox()
+        self.graph_mode_combo.addItems(["Month", "Year"])
+        self.graph_mode_combo.currentIndexChanged.connect(self.graph_mode_changed)
+
+        # Create button to show/hide the summary of expected hours and overtime
+        self.show_summary_button = QPushButton("Show Summary")
+        self.show_summary_button.clicked.connect(self.toggle_summary)
+
+        # Create combo box for the project the timer and the table are on,
+        # typing a new name and pressing enter adds a project
+        self.project_combo = QComboBox()
+        self.project_combo.setEditable(True)
+        self.project_combo.setInsertPolicy(QComboBox.InsertAtBottom)
+        self.project_combo.addItems(self.projects)
+        self.project_combo.setCurrentText(self.active_project)
+        self.project_combo.currentIndexChanged.connect(self.project_changed)
+
+        # Create combo box for the span of days the table shows
+        self.view_mode_combo = QComboBox()
+        self.view_mode_combo.addItems(["Month", "Quarter", "Year", "All"])
+        self.view_mode_combo.currentIndexChanged.connect(self.populate_table)
+
+        # Create table to display hours worked, longer spans than a month use
+        # a range model created on first use
+        self.month_model = TimesheetModel(
+            self.store,
+            self.selected_year,
+            self.selected_month,
+            self.active_project,
+            (self.current_year, self.current_month, self.current_day),
+            self.weekend_days,
         )
+        self.month_model.edited.connect(self.cell_changed)
+        self.range_model = None
+        self.table_model = self.month_model
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         self.table.horizontalHeader().setStretchLastSection(True)
-        self.populate_table()
-        self.table.cellChanged.connect(self.cell_changed)
-        self.table.cellDoubleClicked.connect(self.cell_double_clicked)
-
-        # Create graph widget
-        self.graph = plt.figure()
-        self.plot_hours_worked()
-        self.graph.canvas.hide()
+        # the date and time columns are sized when a month or range is shown,
+        # from the visible rows only as a range can have thousands; sizing them
+        # on every change would measure all visible cells on every timer tick
+        self.table.horizontalHeader().setResizeContentsPrecision(0)
+        self.table.doubleClicked.connect(self.cell_double_clicked)
+        self.table.itemDelegate().closeEditor.connect(self.cell_editor_closed)
+
+        # The graph widget is created the first time it is shown
+        self.graph = None
+        self.graph_redraw_timer = QTimer()
+        self.graph_redraw_timer.setSingleShot(True)
+        self.graph_redraw_timer.timeout.connect(self.plot_hours_worked)
+
+        # The summary panel below the table, filled when it is first shown
+        self.summary_label = QLabel()
+        self.summary_label.hide()
+        self.summary_timer = QTimer()
+        self.summary_timer.setSingleShot(True)
+        self.summary_timer.timeout.connect(self.update_summary)
 
         # Create buttons to start, and add hours to the timer
         self.set_timer_button = QPushButton("Start")
@@ -155,21 +250,25 @@ class MainWindow(QMainWindow):
         timer_layout = QHBoxLayout()
         timer_layout.addWidget(self.month_combo)
         timer_layout.addWidget(self.year_combo)
+        timer_layout.addWidget(self.project_combo)
+        timer_layout.addWidget(self.view_mode_combo)
         timer_layout.addWidget(self.set_timer_button)
         timer_layout.addWidget(self.timer_label)
         timer_layout.addWidget(self.today_label)
         timer_layout.addWidget(self.show_graph_button)
+        timer_layout.addWidget(self.graph_mode_combo)
+        timer_layout.addWidget(self.show_summary_button)
 
         table_layout = QVBoxLayout()
         table_layout.addWidget(self.table)
+        table_layout.addWidget(self.summary_label)
 
-        graph_layout = QVBoxLayout()
-        graph_layout.addWidget(self.graph.canvas)
+        self.graph_layout = QVBoxLayout()
 
         main_layout = QVBoxLayout()
         main_layout.addLayout(timer_layout)
         main_layout.addLayout(table_layout)
-        main_layout.addLayout(graph_layout)
+        main_layout.addLayout(self.graph_layout)
 
         # Create central widget and set layout
         central_widget = QWidget()
@@ -177,17 +276,115 @@ class MainWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
     def show_settings(self):
-        settings_window = SettingsWindow()
+        settings_window = SettingsWindow(self.writer)
         if settings_window.exec_() == QDialog.Accepted:
             self.load_settings()
-            self.table.blockSignals(True)
+            self.apply_settings()
+
+    def show_search(self):
+        if self.search_dialog is None:
+            self.search_dialog = SearchDialog(self.notes_index)
+            self.search_dialog.day_activated.connect(self.show_day)
+        self.search_dialog.show()
+        self.search_dialog.raise_()
+        self.search_dialog.query_edit.setFocus()
+
+    def show_day(self, date, project):
+        # select a day of a project in the table, e.g. a search result
+        if project != self.active_project:
+            index = self.project_combo.findText(project)
+            if index < 0:
+                self.project_combo.addItem(project)
+                index = self.project_combo.count() - 1
+            self.project_combo.setCurrentIndex(index)
+        year_index = self.year_combo.findText(str(date.year))
+        if year_index < 0:
+            years = sorted([int(self.year_combo.itemText(i)) for i in range(self.year_combo.count())] + [date.year])
+            year_index = years.index(date.year)
+            self.year_combo.insertItem(year_index, str(date.year))
+        # the range modes show the selected month, so that moves them too
+        self.month_combo.setCurrentIndex(date.month - 1)
+        self.year_combo.setCurrentIndex(year_index)
+        row = self.table_model.row_of(date)
+        if row is not None:
+            self.table.selectRow(row)
+            self.table.scrollTo(self.table_model.index(row, 2))
+        self.activateWindow()
+
+    def apply_settings(self):
+        self.storage.flush_interval = self.flush_interval
+        self.store.cache_size = self.month_cache_size
+        self.store.evict()
+        self.render_timer(self.timer_seconds)
+        self.month_model.set_weekend_days(self.weekend_days)
+        if self.range_model is not None:
+            self.range_model.set_weekend_days(self.weekend_days)
+        if self.analytics is not None:
+            self.analytics.set_settings(self.max_hours, self.weekend_days)
+            self.update_summary()
+
+    def watch_files(self):
+        # files are replaced when written, which drops them from the watcher
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        paths = [path for path in self.writer.watch_paths(list(self.store.sheets)) if path not in watched]
+        if paths:
+            self.watcher.addPaths(paths)
+
+    def schedule_reload(self, path):
+        # changes come in bursts, e.g. a journal append and a compaction; a
+        # month's own files changing doesn't add or remove a month
+        if not MONTH_FILE.match(os.path.basename(path)):
+            self.stored_months = None
+        if not self.reload_timer.isActive():
+            self.reload_timer.start(200)
+
+    def reload_changes(self):
+        with self.writer.try_lock() as locked:
+            if locked:
+                self.reload_changed_data()
+            else:
+                # most likely this instance's own write being reported, look
+                # again after it rather than block the window until it ends
+                self.reload_timer.start(200)
+
+    def reload_changed_data(self):
+        # the settings and months this instance wrote itself are recognised by
+        # the storage, whichever watched path reported the change
+        if self.writer.settings_changed():
+            self.reload_settings()
+        changed = [key for key in list(self.store.sheets) if self.store.refresh(*key)]
+        if changed:
             self.populate_table()
-            self.table.blockSignals(False)
+            if (self.current_year, self.current_month) in changed:
+                today = self.store.sheet(self.current_year, self.current_month)
+                self.set_timer_seconds(today.project_seconds(self.active_project, self.current_day - 1))
+            if self.graph_visible():
+                self.plot_hours_worked()
+        self.watch_files()
+
+    def reload_settings(self):
+        # settings saved by another instance, except for its active project
+        active_project = self.active_project
+        known_projects = list(self.projects)
+        self.load_settings()
+        self.active_project = active_project
+        new_projects = [name for name in self.projects if name not in known_projects]
+        self.projects = known_projects + new_projects
+        if new_projects:
+            self.project_combo.addItems(new_projects)
+        self.apply_settings()
+
+    def graph_visible(self):
+        return self.graph is not None and self.graph.canvas.isVisible()
 
     def toggle_graph_visibility(self):
+        if self.graph is None:
+            self.graph = HoursGraph()
+            self.graph.canvas.hide()
+            self.graph_layout.addWidget(self.graph.canvas)
         window_ratio = self.width() / self.height()
         if window_ratio > 1.2:
-            if self.graph.canvas.isVisible():
+            if self.graph_visible():
                 self.graph.canvas.hide()
                 self.show_graph_button.setText("Show Graph")
                 self.table.show()
@@ -197,7 +394,7 @@ class MainWindow(QMainWindow):
                 self.show_graph_button.setText("Hide Graph")
                 self.table.hide()
         else:
-            if self.graph.canvas.isVisible():
+            if self.graph_visible():
                 self.graph.canvas.hide()
                 self.show_graph_button.setText("Show Graph")
                 self.table.show()
@@ -207,8 +404,65 @@ class MainWindow(QMainWindow):
                 self.show_graph_button.setText("Hide Graph")
                 self.table.show()
 
+    def toggle_summary(self):
+        if self.analytics is None:
+            self.analytics = Analytics(self.aggregate_index.month_seconds, self.max_hours, self.weekend_days)
+            self.store.save_listeners.append(self.analytics.month_saved)
+        if self.summary_label.isHidden():
+            self.summary_label.show()
+            self.show_summary_button.setText("Hide Summary")
+            self.update_summary()
+        else:
+            self.summary_label.hide()
+            self.show_summary_button.setText("Show Summary")
+
+    def update_summary(self):
+        # figures for the days the table shows, and the balance of all months
+        if self.analytics is None or self.summary_label.isHidden():
+            return
+        self.summary_timer.stop()
+        span = self.view_mode_combo.currentText()
+        if span == "Month":
+            first = datetime.date(self.selected_year, self.selected_month, 1)
+            last = self.last_day(self.selected_year, self.selected_month)
+        else:
+            first, last = self.view_range(span)
+        lines = summary_lines(self.analytics.summary(first, last), self.max_hours)
+        months = self.known_months()
+        if months:
+            overall = self.analytics.summary(datetime.date(*months[0], 1), self.current_date.toPyDate())
+            lines.append(f"Overtime balance over all months {format_balance(overall['balance'])}")
+        self.summary_label.setText("\n".join(lines))
+
+    def known_months(self):
+        if self.stored_months is None:
+            self.stored_months = self.writer.stored_months()
+        return self.stored_months
+
+    def month_saved(self, sheet):
+        # a month saved for the first time is stored from now on
+        key = (sheet.year, sheet.month)
+        if self.stored_months is not None and key not in self.stored_months:
+            self.stored_months = sorted(self.stored_months + [key])
+
+    def closeEvent(self, event):
+        # nothing is reloaded once the storage is closed
+        self.watcher.blockSignals(True)
+        self.reload_timer.stop()
+        self.timer_engine.stop()
+        self.save_intervals()
+        self.save_data()
+        self.writer.close()
+        self.aggregate_index.save()
+        self.notes_index.save()
+        self.instrumentation.dump()
+        super().closeEvent(event)
+
     def keyPressEvent(self, event: QKeyEvent | None) -> None:
-        if event.key() == Qt.Key_T:
+        if event.key() == Qt.Key_D and event.modifiers() == Qt.ControlModifier | Qt.ShiftModifier:
+            self.debug_dialog = DebugDialog(self.instrumentation)
+            self.debug_dialog.show()
+        elif event.key() == Qt.Key_T:
             self.set_timer()
         elif event.key() == Qt.Key_R:
             self.reset_selected_cells()
@@ -216,224 +470,222 @@ class MainWindow(QMainWindow):
             self.add_hours()
         elif event.key() == Qt.Key_G:
             self.toggle_graph_visibility()
+        elif event.key() == Qt.Key_S:
+            self.toggle_summary()
         elif event.key() == Qt.Key_Escape:
             self.close()
 
     def month_changed(self):
-        self.table.blockSignals(True)
+        self.writer.flush(self.selected_year, self.selected_month)
+        self.aggregate_index.save()
+        self.notes_index.save()
         self.selected_month = self.month_combo.currentIndex() + 1
         self.populate_table()
-        self.load_data()
-        self.recalculate_total_worked()
-        if self.graph.canvas.isVisible():
+        if self.graph_visible():
             self.plot_hours_worked()
-        self.table.blockSignals(False)
 
     def year_changed(self):
-        self.table.blockSignals(True)
+        self.writer.flush(self.selected_year, self.selected_month)
+        self.aggregate_index.save()
+        self.notes_index.save()
         self.selected_year = int(self.year_combo.currentText())
         self.populate_table()
-        self.load_data()
-        self.recalculate_total_worked()
-        if self.graph.canvas.isVisible():
+        if self.graph_visible():
             self.plot_hours_worked()
-        self.table.blockSignals(False)
 
     def set_timer(self):
         if self.timer.isActive():
             self.timer.stop()
+            self.timer_engine.stop()
+            self.save_intervals()
             self.set_timer_button.setText("Start")
         else:
+            self.timer_engine.start()
             self.timer.start(1000)
             self.set_timer_button.setText("Stop")
 
+    def save_intervals(self):
+        # the timer's finished intervals count for today and the active project
+        self.interval_journal.append(
+            self.current_date.toPyDate(), self.active_project, self.timer_engine.take_intervals()
+        )
 
-    def is_weekend(self, day_of_month):
-        date = QDate(self.selected_year, self.selected_month, day_of_month)
-        day_of_week = date.dayOfWeek()-1
-        if day_of_week in self.weekend_days:
-            return True
-        else:
-            return False
-
-    def update_timer(self):
-        current_time = datetime.datetime.strptime(
-            self.timer_label.text(), "%H:%M:%S"
-        ).time()
-        current_hours = current_time.hour
-        current_minutes = current_time.minute
-        current_seconds = current_time.second
-        total_seconds = (
-            current_hours * 3600 + current_minutes * 60 + current_seconds + 1
+    def ask_about_gap(self, gap):
+        # a long pause between ticks, usually because the computer was suspended
+        self.timer.stop()
+        answer = QMessageBox.question(
+            self,
+            "Timer",
+            f"The timer wasn't updated for {format_duration(int(gap))}, e.g. because the computer "
+            "was suspended. Count this time?",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes,
         )
-        new_time = '{:0>8}'.format(str(datetime.timedelta(seconds=total_seconds)))
-        # set border of timer to red if over 8 hours
-        if current_hours >= 8:
-            self.timer_label.setStyleSheet(
-                "font-size: 50px; font-weight: bold; border: 2px solid red; border-radius: 10px;"
-            )
+        if answer == QMessageBox.No:
+            self.timer_engine.discard_gap()
         else:
-            self.timer_label.setStyleSheet(
-                "font-size: 50px; font-weight: bold; border: 2px solid green; border-radius: 10px;"
-            )
-        self.timer_label.setText(new_time)
-        # update the time worked for the current day
-        if self.editing_today_cell is False:
-            # only update if current month and year are selected
-            if self.current_month == self.selected_month and self.current_year == self.selected_year:
-                time_worked_item = self.table.item(self.current_day - 1, 1)
-                time_worked = time_worked_item.text()
-                if time_worked:
-                    time_worked_item.setText(new_time)
-                    self.save_data()
-
-    def cell_changed(self, row, column):
-        if column == 1:
-            if row == self.table.rowCount() - 1:
-                return  # don't allow the total row to be edited
-
-            update_time = self.table.item(row, column)
-            new_time = update_time.text()
-
-            if update_time.text() == "":
-                new_time = QTime(0, 0, 0).toString("hh:mm:ss")
+            self.timer_engine.keep_gap()
+        self.timer.start(1000)
 
+    def timer_style(self, color):
+        return f"font-size: 50px; font-weight: bold; border: 2px solid {color}; border-radius: 10px;"
 
-            elif update_time.text()[-1] == "s":
-                new_time = QTime(0, 0, int(update_time.text()[:-1])).toString("hh:mm:ss")
+    def set_timer_seconds(self, seconds):
+        self.timer_engine.set_elapsed(seconds)
+        self.render_timer(seconds)
 
-            elif update_time.text()[-1] == "m":
-                new_time = QTime(0, int(update_time.text()[:-1]), 0).toString("hh:mm:ss")
+    def render_timer(self, seconds):
+        # only touch the label when the visible text or the colour changes
+        if seconds != self.timer_seconds:
+            self.timer_seconds = seconds
+            self.timer_label.setText(format_duration(seconds))
+        # set border of timer to red if over the max hours from the settings
+        over_limit = seconds >= self.max_hours * 3600
+        if over_limit != self.timer_over_limit:
+            self.timer_over_limit = over_limit
+            self.timer_label.setStyleSheet(self.timer_style("red" if over_limit else "green"))
 
-            elif update_time.text()[-1] == "h":
-                if int(update_time.text()[:-1]) > 24:
-                    new_time = QTime(24, 0, 0).toString("hh:mm:ss")
-                else:
-                    new_time = QTime(int(update_time.text()[:-1]), 0, 0).toString("hh:mm:ss")
 
-            if new_time != update_time.text():
-                update_time.setText(new_time)
-                # update the timer if the current day is being edited
-                if self.current_month == self.selected_month and self.current_year == self.selected_year:
-                    if self.current_date.toString("dd/MM/yyyy") == self.table.item(row, 0).text():
-                        self.timer_label.setText(new_time)
-                        self.editing_today_cell = False
+    def update_timer(self):
+        # ticks only refresh the display, the time comes from the timer engine
+        gap = self.timer_engine.tick()
+        if gap > self.idle_threshold:
+            self.ask_about_gap(gap)
+        seconds = self.timer_engine.elapsed()
+        if seconds == self.timer_seconds:
+            return  # tick arrived before the next full second
+        self.render_timer(seconds)
+        # update the time worked for the current day, also while another month is shown
+        if self.editing_today_cell is False:
+            self.store.set_seconds(
+                self.current_year, self.current_month, self.current_day - 1, seconds, self.active_project
+            )
+            today_row = self.table_model.today_row()
+            if today_row is not None:
+                self.table_model.refresh_row(today_row)
+                # redraw the graph at most every few seconds while the timer runs
+                if self.graph_visible() and not self.graph_redraw_timer.isActive():
+                    self.graph_redraw_timer.start(5000)
+            self.save_data()
 
-            self.recalculate_total_worked()
-            if self.graph.canvas.isVisible():
-                self.plot_hours_worked()
+    def cell_changed(self, row, column):
+        # the timer follows edits of today's time
+        if column == 1 and row == self.table_model.today_row():
+            today = self.store.sheet(self.current_year, self.current_month)
+            self.set_timer_seconds(today.project_seconds(self.active_project, self.current_day - 1))
+            self.editing_today_cell = False
+        if column == 1 and self.graph_visible():
+            self.plot_hours_worked()
         self.save_data()
 
-    def cell_double_clicked(self, row, column):
-        if self.current_date.toString("dd/MM/yyyy") == self.table.item(row, 0).text():
+    def cell_double_clicked(self, index):
+        if index.row() == self.table_model.today_row():
             self.editing_today_cell = True
-        
-
-    def recalculate_total_worked(self):
-
-        total_worked = 0
-        for i in range(self.table.rowCount() - 1):
-            time_worked = self.table.item(i, 1).text()
-            if time_worked:
-                qtime_worked = QTime().fromString(time_worked, "hh:mm:ss")
-                hours_worked = (
-                    qtime_worked.hour()
-                    + qtime_worked.minute() / 60
-                    + qtime_worked.second() / 3600
-                )
-                total_worked += hours_worked
-
-        total_worked_formatted = ":".join(
-            [
-                "{:03d}".format(int(total_worked * 3600 // 3600)),
-                "{:02d}".format(int((total_worked * 3600 // 60) % 60)),
-                "{:02d}".format(int(total_worked * 3600 % 60)),
-            ]
-        )
-        # set the total worked hours in the last row
-        self.table.item(self.table.rowCount() - 1, 1).setText(total_worked_formatted)
+
+    def cell_editor_closed(self):
+        self.editing_today_cell = False
 
     def reset_selected_cells(self):
-        selected_cells = self.table.selectedItems()
-        for cell in selected_cells:
-            cell.setText("00:00:00")
+        for index in self.table.selectionModel().selectedIndexes():
+            day = self.table_model.day_of_row(index.row())
+            if index.column() != 1 or day is None:
+                continue
+            self.store.set_seconds(*day, 0, self.active_project)
+            self.table_model.refresh_row(index.row())
             # Reset the timer if the current day is being reset
-            if self.current_date.toString("dd/MM/yyyy") == self.table.item(cell.row(), 0).text():
-                self.timer_label.setText("00:00:00")
-        self.recalculate_total_worked()
-        if self.graph.canvas.isVisible():
+            if index.row() == self.table_model.today_row():
+                self.set_timer_seconds(0)
+        if self.graph_visible():
+            self.plot_hours_worked()
+        self.save_data()
+
+    def graph_mode_changed(self):
+        if self.graph_visible():
             self.plot_hours_worked()
+
+    def project_changed(self):
+        project = self.project_combo.currentText().strip()
+        if not project or project == self.active_project:
+            return
         self.save_data()
+        # the running interval so far counts for the previous project
+        self.timer_engine.split()
+        self.save_intervals()
+        self.active_project = project
+        if project not in self.projects:
+            self.projects.append(project)
+        self.save_projects()
+        self.month_model.set_project(project)
+        if self.range_model is not None:
+            self.range_model.set_project(project)
+        # the timer shows the time of the new project
+        today = self.store.sheet(self.current_year, self.current_month)
+        self.set_timer_seconds(today.project_seconds(project, self.current_day - 1))
 
     def populate_table(self):
-        self.table.clearContents()
-        days_in_month = QDate(self.selected_year, self.selected_month, 1).daysInMonth()
-        self.table.setRowCount(days_in_month + 1)  # add one row for the total
-        total_worked = 0
-        for i in range(days_in_month):
-            date = QDate(self.selected_year, self.selected_month, 1).addDays(i)
-            self.table.setItem(
-                i, 0, QTableWidgetItem(str(QDate.toString(date, "dd/MM/yyyy")))
-            )
-            self.table.item(i, 0).setFlags(Qt.ItemIsEnabled)
-        
-            self.table.setItem(i, 1, QTableWidgetItem("00:00:00"))
-            self.table.setItem(i, 2, QTableWidgetItem(""))
-
-            day_of_month = date.day()
-            if self.current_date.toString("dd/MM/yyyy") == date.toString("dd/MM/yyyy"):
-                for j in range(self.table.columnCount()):
-                    # rbg dark green for modern design and dark mode: (0, 128, 0)
-                    self.table.item(i, j).setBackground(QColor(0, 100, 0))            
-            elif self.is_weekend(day_of_month):
-                for j in range(self.table.columnCount()):
-                    self.table.item(i, j).setBackground(Qt.darkGray)
-            time_worked = self.table.item(i, 1).text()
-            if time_worked:
-                qtime_worked = QTime().fromString(time_worked, "hh:mm:ss")
-                hours_worked = (
-                    qtime_worked.hour()
-                    + qtime_worked.minute() / 60
-                    + qtime_worked.second() / 3600
-                )
-                total_worked += hours_worked
-
-        # set the total worked hours in the last row
-        self.table.setItem(days_in_month, 0, QTableWidgetItem("Total Worked Hours"))
-        self.table.setItem(
-            days_in_month,
-            1,
-            QTableWidgetItem(
-                QTime().addSecs(int(total_worked * 3600)).toString("hh:mm:ss")
-            ),
-        )
-        self.table.item(days_in_month, 0).setFlags(Qt.ItemIsEnabled)
-        self.table.item(days_in_month, 1).setFlags(Qt.ItemIsEnabled)
-    def plot_hours_worked(self):
-        worked = []
-        for i in range(self.table.rowCount()-1):
-            time_worked = self.table.item(i, 1).text()
-            if time_worked:
-                qtime_worked = QTime().fromString(time_worked, "hh:mm:ss")
-                hours_worked = (
-                    qtime_worked.hour()
-                    + qtime_worked.minute() / 60
-                    + qtime_worked.second() / 3600
+        # months seen before are cached, unless their file changed since
+        self.store.refresh(self.selected_year, self.selected_month)
+        span = self.view_mode_combo.currentText()
+        if span == "Month":
+            self.month_model.set_month(self.selected_year, self.selected_month)
+            model = self.month_model
+        else:
+            first, last = self.view_range(span)
+            if self.range_model is None:
+                self.range_model = RangeModel(
+                    self.store,
+                    first,
+                    last,
+                    self.active_project,
+                    (self.current_year, self.current_month, self.current_day),
+                    self.weekend_days,
                 )
-                worked.append(float(hours_worked))
+                self.range_model.edited.connect(self.cell_changed)
             else:
-                worked.append(0)
-        plt.clf()
-        sns.set_style("whitegrid")
-        sns.barplot(x=range(1, len(worked)+1), y=worked, color="lightblue")
-        plt.title("Hours Worked Over the Month")
-        plt.xlabel("Days in Current Month")
-        plt.ylabel("Hours Worked")
-        self.graph.canvas.draw()
+                self.range_model.set_range(first, last)
+            model = self.range_model
+        if model is not self.table_model:
+            self.table_model = model
+            self.table.setModel(model)
+        self.table.resizeColumnToContents(0)
+        self.table.resizeColumnToContents(1)
+        # list projects found in the month that were not known yet
+        sheet = self.store.sheet(self.selected_year, self.selected_month)
+        new_projects = [name for name in sheet.projects if name not in self.projects]
+        if new_projects:
+            self.projects.extend(new_projects)
+            self.project_combo.addItems(new_projects)
+            self.save_projects()
+        self.update_summary()
+
+    def view_range(self, span):
+        # first and last day shown for "Quarter", "Year" or "All"
+        year, month = self.selected_year, self.selected_month
+        if span == "Quarter":
+            first_month = (month - 1) // 3 * 3 + 1
+            return datetime.date(year, first_month, 1), self.last_day(year, first_month + 2)
+        if span == "Year":
+            return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+        months = self.known_months() + [(self.current_year, self.current_month)]
+        return datetime.date(*min(months), 1), self.last_day(*max(months))
+
+    def last_day(self, year, month):
+        return datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+
+    def plot_hours_worked(self):
+        if self.graph is None:
+            return
+        self.graph_redraw_timer.stop()
+        if self.graph_mode_combo.currentText() == "Year":
+            self.graph.plot_year(self.selected_year, self.aggregate_index.year_days(self.selected_year))
+        else:
+            sheet = self.store.sheet(self.selected_year, self.selected_month)
+            self.graph.plot([seconds / 3600 for seconds in sheet.seconds])
 
 
 if __name__ == "__main__":
+    instrumentation = Instrumentation.from_arguments(sys.argv)
     app = QApplication(sys.argv)
-    window = MainWindow()
+    window = MainWindow(instrumentation)
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,172 @@
+import contextlib
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from storage import apply_record
+
+
+class BackgroundWriter(QObject):
+    # Puts a storage backend behind a writer thread so that disk I/O doesn't
+    # run in the Qt event loop. record() only queues a copy of the day; days
+    # queued again before the thread got to them are written once, with their
+    # latest content. Everything else runs on the calling thread, under a lock
+    # shared with the writer thread, except for reading settings, the stored
+    # months and their mtimes, which the backends do without touching what the
+    # writer thread uses, so they never wait for a slow write. Failures are
+    # reported through the signals; days that failed to be written are kept
+    # and tried again with the next record(), flush() or close(), unless a
+    # newer version was queued since.
+    write_failed = pyqtSignal(str)
+    load_failed = pyqtSignal(str)
+
+    def __init__(self, storage):
+        super().__init__()
+        self.storage = storage
+        self.directory = storage.directory
+        # reentrant, so that callers can hold it around several calls, see try_lock()
+        self.lock = threading.RLock()
+        self.queue = threading.Condition()
+        self.pending = {}
+        # the days the thread is writing, until they are on disk
+        self.writing = {}
+        self.failed = {}
+        self.busy = False
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name="background-writer", daemon=True)
+        self.thread.start()
+
+    def record(self, year, month, date, day):
+        with self.queue:
+            self.pending.setdefault((year, month), {})[date] = dict(day) if day is not None else None
+            self.retry_failed()
+            self.queue.notify_all()
+
+    def retry_failed(self):
+        # with self.queue held; queued days are newer than failed ones
+        for key, days in self.failed.items():
+            pending = self.pending.setdefault(key, {})
+            for date, day in days.items():
+                pending.setdefault(date, day)
+        self.failed = {}
+
+    def run(self):
+        while True:
+            with self.queue:
+                while not self.pending and not self.stopping:
+                    self.queue.wait()
+                if not self.pending:
+                    return
+                pending, self.pending = self.pending, {}
+                self.writing = pending
+                self.busy = True
+            self.write_pending(pending)
+            with self.queue:
+                self.writing = {}
+                self.busy = False
+                self.queue.notify_all()
+
+    def write_pending(self, pending):
+        for (year, month), days in pending.items():
+            try:
+                with self.lock, self.storage.batch():
+                    for date, day in days.items():
+                        self.storage.record(year, month, date, day)
+            except Exception as error:
+                with self.queue:
+                    # days queued again meanwhile are newer than the failed ones
+                    queued = self.pending.get((year, month), {})
+                    failed = self.failed.setdefault((year, month), {})
+                    failed.update((date, day) for date, day in days.items() if date not in queued)
+                self.write_failed.emit(f"Could not save {year}-{month}: {error}")
+
+    @contextlib.contextmanager
+    def try_lock(self):
+        # yields whether the lock was free, holding it if so; for the GUI
+        # thread, which shouldn't wait for a write in progress
+        locked = self.lock.acquire(blocking=False)
+        try:
+            yield locked
+        finally:
+            if locked:
+                self.lock.release()
+
+    def wait_idle(self):
+        with self.queue:
+            while self.pending or self.busy:
+                self.queue.wait()
+
+    def flush(self, year=None, month=None):
+        with self.queue:
+            if self.failed:
+                self.retry_failed()
+                self.queue.notify_all()
+        self.wait_idle()
+        try:
+            with self.lock:
+                self.storage.flush(year, month)
+        except Exception as error:
+            self.write_failed.emit(f"Could not save: {error}")
+
+    def close(self):
+        self.flush()
+        with self.queue:
+            self.stopping = True
+            self.queue.notify_all()
+        self.thread.join()
+        with self.lock:
+            self.storage.close()
+        if self.failed:
+            days = sum(len(days) for days in self.failed.values())
+            self.write_failed.emit(f"{days} changed days could not be saved")
+
+    def load_month(self, year, month):
+        try:
+            with self.lock:
+                data = self.storage.load_month(year, month)
+        except (OSError, ValueError) as error:
+            self.load_failed.emit(f"Could not load {year}-{month}: {error}")
+            data = {}
+        return self.with_pending(year, month, data)
+
+    def read_month(self, year, month):
+        with self.lock:
+            data = self.storage.read_month(year, month)
+        return self.with_pending(year, month, data)
+
+    def with_pending(self, year, month, data):
+        # days that are queued, being written or failed, but not on disk yet;
+        # the thread may be waiting for the lock the caller holds
+        with self.queue:
+            days = dict(self.failed.get((year, month), {}))
+            days.update(self.writing.get((year, month), {}))
+            days.update(self.pending.get((year, month), {}))
+        for date, day in days.items():
+            record = {"date": date}
+            if day is not None:
+                record.update(day)
+            apply_record(data, record)
+        return data
+
+    def month_changed(self, year, month):
+        with self.lock:
+            return self.storage.month_changed(year, month)
+
+    def watch_paths(self, months):
+        return self.storage.watch_paths(months)
+
+    def stored_months(self):
+        return self.storage.stored_months()
+
+    def month_mtime(self, year, month):
+        return self.storage.month_mtime(year, month)
+
+    def load_settings(self):
+        return self.storage.load_settings()
+
+    def settings_changed(self):
+        return self.storage.settings_changed()
+
+    def save_settings(self, settings):
+        with self.lock:
+            self.storage.save_settings(settings)
@@ -0,0 +1,853 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from aggregate_index import AggregateIndex
+from analytics import Analytics
+from binary_month import BinaryMonth, binary_path, convert
+from durations import parse_duration
+from search import NotesIndex
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+from timesheet_store import TimesheetStore, date_key
+
+# Benchmarks of the application, run with an offscreen Qt platform:
+#   python benchmark.py [--only NAME ...] [--json results.json] [--compare baseline.json]
+# Every benchmark prints what it measured and records it in RESULTS, which
+# --json writes out and --compare checks against an earlier run. Only times,
+# sizes and counts of calls are recorded, so lower is better for every result;
+# whether the code still works is for the tests in tests/.
+
+RESULTS = {}
+UNITS = ("us", "ms", "bytes", "calls")
+
+
+def record(name, value, unit):
+    if unit not in UNITS:
+        raise ValueError(f"{name}: only times, sizes and counts are recorded, not {unit!r}")
+    RESULTS[name] = {"value": value, "unit": unit}
+
+
+def read_io_counters():
+    # Linux only: bytes handed to write() and number of write syscalls so far
+    counters = {}
+    with open("/proc/self/io", "r") as f:
+        for line in f:
+            name, value = line.split(":")
+            counters[name] = int(value)
+    return counters["wchar"], counters["syscw"]
+
+
+def month_data(seconds_today):
+    data = {}
+    for day in range(1, 32):
+        data[f"{day:02d}/01/2024"] = {"time_worked": "01:00:00", "notes": "note " * 5}
+    data["15/01/2024"]["time_worked"] = "{:02d}:{:02d}:{:02d}".format(
+        seconds_today // 3600, seconds_today // 60 % 60, seconds_today % 60
+    )
+    return data
+
+
+def bench_rewrite_every_tick(directory, ticks):
+    # the behaviour before the journal: rewrite the whole month every second
+    filename = os.path.join(directory, "2024-1.json")
+    for tick in range(ticks):
+        with open(filename, "w") as f:
+            json.dump(month_data(tick), f)
+
+
+def bench_journal(directory, ticks):
+    clock = [0]
+    storage = JsonStorage(directory, flush_interval=60, clock=lambda: clock[0])
+    for tick in range(ticks):
+        clock[0] = tick
+        storage.save_month(2024, 1, month_data(tick))
+    storage.close()
+
+
+def run_timer_hour():
+    ticks = 3600
+    for name, bench in (("rewrite", bench_rewrite_every_tick), ("journal", bench_journal)):
+        with tempfile.TemporaryDirectory() as directory:
+            bytes_before, calls_before = read_io_counters()
+            bench(directory, ticks)
+            bytes_after, calls_after = read_io_counters()
+        print(
+            f"{name:>8}: {bytes_after - bytes_before:>10} bytes, "
+            f"{calls_after - calls_before:>6} write syscalls per hour of timer"
+        )
+        record(f"timer_hour.{name}.bytes", bytes_after - bytes_before, "bytes")
+        record(f"timer_hour.{name}.write_calls", calls_after - calls_before, "calls")
+
+
+def old_timer_tick(label):
+    # update_timer before the timer engine: parse the label and restyle every tick
+    current_time = datetime.datetime.strptime(label.text(), "%H:%M:%S").time()
+    total_seconds = current_time.hour * 3600 + current_time.minute * 60 + current_time.second + 1
+    new_time = "{:0>8}".format(str(datetime.timedelta(seconds=total_seconds)))
+    color = "red" if current_time.hour >= 8 else "green"
+    label.setStyleSheet(
+        f"font-size: 50px; font-weight: bold; border: 2px solid {color}; border-radius: 10px;"
+    )
+    label.setText(new_time)
+
+
+def run_timer_tick_cost():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication, QLabel
+    from app import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    ticks = 10000
+
+    label = QLabel("00:00:00")
+    label.show()
+    start = time.process_time()
+    for _ in range(ticks):
+        old_timer_tick(label)
+    before = (time.process_time() - start) / ticks
+
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            window = MainWindow()
+            window.show()
+            clock = [0]
+            window.timer_engine.clock = lambda: clock[0]
+            window.timer_engine.start()
+            window.editing_today_cell = True  # measure the timer alone
+            start = time.process_time()
+            for tick in range(ticks):
+                clock[0] = tick + 1
+                window.update_timer()
+            after = (time.process_time() - start) / ticks
+            window.close()
+        finally:
+            os.chdir(cwd)
+    app.processEvents()
+    print(f"  before: {before * 1e6:8.1f} us CPU per tick")
+    print(f"   after: {after * 1e6:8.1f} us CPU per tick")
+    record("timer_tick.label_parsing", before * 1e6, "us")
+    record("timer_tick.engine", after * 1e6, "us")
+
+
+def generate_months(directory, years, first_year=2015, seed=0):
+    # the same month files with notes for the same arguments, every time
+    rng = random.Random(seed)
+    for year in range(first_year, first_year + years):
+        for month in range(1, 13):
+            data = {}
+            for day in range(1, 29):
+                seconds = rng.randrange(0, 10 * 3600)
+                data[date_key(year, month, day)] = {
+                    "time_worked": "{:02d}:{:02d}:{:02d}".format(
+                        seconds // 3600, seconds // 60 % 60, seconds % 60
+                    ),
+                    "notes": "worked on feature %d" % rng.randrange(100),
+                }
+            with open(os.path.join(directory, f"{year}-{month}.json"), "w") as f:
+                json.dump(data, f)
+
+
+def old_month_total(filename):
+    # load the month and total it by parsing every "hh:mm:ss" string
+    with open(filename, "r") as f:
+        data = json.load(f)
+    total = 0
+    for day in data.values():
+        parsed = datetime.datetime.strptime(day["time_worked"], "%H:%M:%S")
+        total += parsed.hour * 3600 + parsed.minute * 60 + parsed.second
+    return total
+
+
+def run_store_totals(years=10, repeats=20):
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        months = [(year, month) for year in range(2015, 2015 + years) for month in range(1, 13)]
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            old = sum(old_month_total(os.path.join(directory, f"{y}-{m}.json")) for y, m in months)
+        before = time.perf_counter() - start
+
+        start = time.perf_counter()
+        store = TimesheetStore(JsonStorage(directory))
+        for _ in range(repeats):
+            new = sum(store.sheet(y, m).total() for y, m in months)
+        after = time.perf_counter() - start
+    assert old == new
+    print(f"{years} years of totals, {repeats} times:")
+    print(f"  parsing strings: {before * 1000:8.1f} ms")
+    print(f"  TimesheetStore:  {after * 1000:8.1f} ms")
+    record("store_totals.parsing_strings", before * 1000, "ms")
+    record("store_totals.store", after * 1000, "ms")
+
+
+FIRST_WINDOW = """
+import time
+start = time.perf_counter()
+import sys
+from PyQt5.QtWidgets import QApplication
+from app import MainWindow
+app = QApplication(sys.argv)
+window = MainWindow()
+window.show()
+window.table.viewport().repaint()
+app.processEvents()
+print(time.perf_counter() - start)
+"""
+
+
+def run_startup(runs=5, years=10):
+    # time from interpreter start of the script to the first paint of the window
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env["PYTHONPATH"] = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-c", FIRST_WINDOW],
+                cwd=directory,
+                env=env,
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+            times.append(float(output.split()[-1]))
+    print(f"time to first paint: {min(times) * 1000:8.1f} ms (best of {runs}, {years} years of data)")
+    record("startup.first_paint", min(times) * 1000, "ms")
+
+
+def run_graph_redraw(redraws=50):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from graph import HoursGraph
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    graph = HoursGraph()
+    graph.canvas.show()
+    rng = random.Random(0)
+    worked = [rng.uniform(0, 10) for _ in range(31)]
+    results = {}
+    for name, incremental in (("full barplot", False), ("bar heights", True)):
+        start = time.perf_counter()
+        for _ in range(redraws):
+            worked[0] = rng.uniform(0, 10)
+            if not incremental:
+                graph.bars = None
+            graph.plot(worked)
+            graph.canvas.draw()
+        results[name] = (time.perf_counter() - start) / redraws
+    app.processEvents()
+    for name, seconds in results.items():
+        print(f"graph redraw, {name:>12}: {seconds * 1000:8.1f} ms")
+        record(f"graph_redraw.{name.replace(' ', '_')}", seconds * 1000, "ms")
+
+
+def run_year_overview(years=12):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from graph import HoursGraph
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        storage = JsonStorage(directory)
+
+        start = time.perf_counter()
+        index = AggregateIndex(storage)
+        index.refresh()
+        index.save()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = AggregateIndex(storage)
+        index.refresh()
+        reload = time.perf_counter() - start
+
+        graph = HoursGraph()
+        graph.plot_year(2015, index.year_days(2015))
+        start = time.perf_counter()
+        for year in range(2015, 2015 + years):
+            graph.plot_year(year, index.year_days(year))
+        overview = (time.perf_counter() - start) / years
+    app.processEvents()
+    print(f"aggregate index over {years} years: build {build * 1000:.1f} ms, reopen {reload * 1000:.1f} ms")
+    print(f"year overview from the index: {overview * 1000:.2f} ms per year (before canvas paint)")
+    record("year_overview.index_build", build * 1000, "ms")
+    record("year_overview.index_reopen", reload * 1000, "ms")
+    record("year_overview.plot", overview * 1000, "ms")
+
+
+def run_backends(years=10):
+    # the same workload against every storage backend
+    random.seed(0)
+    months = [(year, month) for year in range(2015, 2015 + years) for month in range(1, 13)]
+    for backend in (JsonStorage, SqliteStorage):
+        with tempfile.TemporaryDirectory() as directory:
+            storage = backend(directory, flush_interval=3600)
+            store = TimesheetStore(storage)
+            start = time.perf_counter()
+            for year, month in months:
+                sheet = store.sheet(year, month)
+                for index in range(sheet.days):
+                    store.set_seconds(year, month, index, random.randrange(10 * 3600))
+                    store.set_notes(year, month, index, "worked on feature %d" % index)
+                store.save()
+            storage.close()
+            write = time.perf_counter() - start
+
+            storage = backend(directory)
+            start = time.perf_counter()
+            for year, month in months:
+                storage.read_month(year, month)
+            read = time.perf_counter() - start
+
+            start = time.perf_counter()
+            end = datetime.date(2015 + years - 1, 12, 31)
+            weeks = {}
+            for date, seconds, notes in storage.days_between(end - datetime.timedelta(weeks=52), end):
+                week = date.isocalendar()[:2]
+                weeks[week] = weeks.get(week, 0) + seconds
+            query = time.perf_counter() - start
+            storage.close()
+        print(
+            f"{backend.__name__:>12}: write {write * 1000:7.1f} ms, read {read * 1000:7.1f} ms, "
+            f"52 weekly totals {query * 1000:6.1f} ms ({years} years)"
+        )
+        record(f"backends.{backend.__name__}.write", write * 1000, "ms")
+        record(f"backends.{backend.__name__}.read", read * 1000, "ms")
+        record(f"backends.{backend.__name__}.weekly_totals", query * 1000, "ms")
+
+
+def run_binary_months(years=10, repeats=5):
+    # load and total every month from the JSON files and from .hmonth files;
+    # the results are checked in tests/test_binary_month.py
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        storage = JsonStorage(directory)
+        months = storage.stored_months()
+        start = time.perf_counter()
+        convert(directory)
+        conversion = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            json_total = 0
+            for year, month in months:
+                for day in storage.read_month(year, month).values():
+                    json_total += parse_duration(day["time_worked"])
+        json_time = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            binary_total = 0
+            for year, month in months:
+                with BinaryMonth(binary_path(directory, year, month)) as binary:
+                    binary_total += binary.sum_days()
+        binary_time = (time.perf_counter() - start) / repeats
+
+        # the hours index built from the .hmonth files, which are newer
+        start = time.perf_counter()
+        AggregateIndex(storage).refresh()
+        index_build = time.perf_counter() - start
+
+        json_size = sum(os.path.getsize(storage.snapshot_path(year, month)) for year, month in months)
+        binary_size = sum(os.path.getsize(binary_path(directory, year, month)) for year, month in months)
+    print(f"{years} years, load and total: JSON {json_time * 1000:6.1f} ms, .hmonth {binary_time * 1000:6.1f} ms")
+    print(f"  conversion {conversion * 1000:.1f} ms, {json_size} bytes of JSON, {binary_size} bytes of .hmonth")
+    print(f"  hours index from the .hmonth files {index_build * 1000:.1f} ms")
+    record("binary_months.json_total", json_time * 1000, "ms")
+    record("binary_months.binary_total", binary_time * 1000, "ms")
+    record("binary_months.index_build", index_build * 1000, "ms")
+    record("binary_months.binary_bytes", binary_size, "bytes")
+
+
+def run_notes_search(years=10, queries=200):
+    # build the notes index, reopen it from its file and search it
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        storage = JsonStorage(directory)
+        start = time.perf_counter()
+        index = NotesIndex(storage)
+        index.refresh()
+        index.save()
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = NotesIndex(storage)
+        index.refresh()
+        reopen = time.perf_counter() - start
+
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for _ in range(queries):
+            index.search("work feat %d" % rng.randrange(10))
+        query = (time.perf_counter() - start) / queries
+
+        # a saved month is re-indexed from the store, only its changed days
+        store = TimesheetStore(storage)
+        store.save_listeners.append(index.update_month)
+        store.set_notes(2015, 1, 0, "reviewed the quarterly numbers")
+        start = time.perf_counter()
+        store.save()
+        update = time.perf_counter() - start
+        storage.close()
+    print(
+        f"notes search over {years} years: build {build * 1000:.1f} ms, reopen {reopen * 1000:.1f} ms, "
+        f"prefix query {query * 1000000:.0f} us, save and re-index a month {update * 1000:.2f} ms"
+    )
+    record("notes_search.build", build * 1000, "ms")
+    record("notes_search.reopen", reopen * 1000, "ms")
+    record("notes_search.query", query * 1000000, "us")
+
+
+def run_analytics(years=10, repeats=20):
+    # summaries over all history from the aggregate index, cold, cached and
+    # after a save; the figures are checked in tests/test_analytics.py
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        storage = JsonStorage(directory)
+        index = AggregateIndex(storage)
+        index.refresh()
+        first, last = datetime.date(2015, 1, 1), datetime.date(2015 + years - 1, 12, 31)
+        analytics = Analytics(index.month_seconds, 8, [5, 6], today=lambda: last)
+
+        start = time.perf_counter()
+        analytics.summary(first, last)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(repeats):
+            analytics.summary(first, last)
+        warm = (time.perf_counter() - start) / repeats
+
+        store = TimesheetStore(storage)
+        store.save_listeners += [index.update_month, analytics.month_saved]
+        store.set_seconds(2020, 6, 0, 3600)
+        store.save()
+        start = time.perf_counter()
+        analytics.summary(first, last)
+        update = time.perf_counter() - start
+        storage.close()
+    print(
+        f"analytics over {years} years: first summary {cold * 1000:.1f} ms, cached {warm * 1000:.2f} ms, "
+        f"after saving a month {update * 1000:.2f} ms"
+    )
+    record("analytics.cold", cold * 1000, "ms")
+    record("analytics.cached", warm * 1000, "ms")
+    record("analytics.after_save", update * 1000, "ms")
+
+
+def run_projects(years=5, projects=300):
+    random.seed(0)
+    names = ["project %d" % number for number in range(projects)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = TimesheetStore(JsonStorage(directory))
+        for year in range(2015, 2015 + years):
+            for month in range(1, 13):
+                for index in range(store.sheet(year, month).days):
+                    for name in random.sample(names, 3):
+                        store.set_seconds(year, month, index, random.randrange(4 * 3600), name)
+        store.save()
+        store.storage.close()
+
+        start = time.perf_counter()
+        store = TimesheetStore(JsonStorage(directory))
+        for year in range(2015, 2015 + years):
+            for month in range(1, 13):
+                store.sheet(year, month)
+        load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name in names:
+            store.project_total(name)
+            store.project_month_total(name, 2015, 6)
+        lookups = (time.perf_counter() - start) / projects
+
+        start = time.perf_counter()
+        index = AggregateIndex(store.storage)
+        names_in_index = index.project_names()
+        build = time.perf_counter() - start
+    print(f"{projects} projects over {years} years: load {load * 1000:.1f} ms, "
+          f"total lookup {lookups * 1e6:.2f} us, index of {len(names_in_index)} projects {build * 1000:.1f} ms")
+    record("projects.load", load * 1000, "ms")
+    record("projects.total_lookup", lookups * 1e6, "us")
+    record("projects.index_build", build * 1000, "ms")
+
+
+def run_cli_startup(runs=10):
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, 2)
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable, os.path.join(here, "cli.py"), "--directory", directory, "report", "--month", "2016-03"],
+                capture_output=True,
+                check=True,
+            )
+            times.append(time.perf_counter() - start)
+    print(f"cli.py report: {min(times) * 1000:.1f} ms including interpreter start (best of {runs})")
+    record("cli_startup.report", min(times) * 1000, "ms")
+
+
+def write_archive(path, entries, projects=50):
+    # a date-sorted NDJSON archive with `projects` entries per day
+    day = datetime.date(1970, 1, 1)
+    with open(path, "w") as f:
+        for number in range(entries):
+            if number and number % projects == 0:
+                day += datetime.timedelta(days=1)
+            record = {"date": day.isoformat(), "project": "project %d" % (number % projects)}
+            record["time_worked"] = "%dm" % (number % 240)
+            record["notes"] = "ticket %d" % number
+            f.write(json.dumps(record) + "\n")
+
+
+def run_bulk_io(sizes=(100000, 1000000)):
+    # peak memory of the import should not grow with the size of the archive
+    cli = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    for entries in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            archive = os.path.join(directory, "archive.ndjson")
+            write_archive(archive, entries)
+            data = os.path.join(directory, "data")
+            os.mkdir(data)
+            timings = []
+            for command in (["import", archive, "--dry-run"], ["import", archive], ["export", "--format", "ndjson"]):
+                start = time.perf_counter()
+                with open(os.devnull, "w") as devnull:
+                    subprocess.run([sys.executable, cli, "--directory", data] + command, stdout=devnull, check=True)
+                timings.append(time.perf_counter() - start)
+            # ru_maxrss is in kilobytes on Linux
+            peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+        print(
+            f"{entries:>8} entries: validate {timings[0]:6.1f} s, import {timings[1]:6.1f} s, "
+            f"export {timings[2]:6.1f} s, peak RSS so far {peak / 2 ** 20:.0f} MB"
+        )
+        for name, seconds in zip(("validate", "import", "export"), timings):
+            record(f"bulk_io.{entries}.{name}", seconds * 1000, "ms")
+        record(f"bulk_io.{entries}.peak_rss", peak, "bytes")
+
+
+def run_timer_accounting(hours=8, seed=1):
+    # a workday of late and dropped ticks with two project switches, appended
+    # to the interval journal and replayed; see tests/test_timer_engine.py
+    from timer_engine import IntervalJournal, TimerEngine
+
+    rng = random.Random(seed)
+    now = [1000.0]
+    engine = TimerEngine(clock=lambda: now[0], wall_clock=lambda: now[0])
+    today = datetime.date(2024, 1, 31)
+    with tempfile.TemporaryDirectory() as directory:
+        journal = IntervalJournal(directory)
+        ticks = 0
+        start = time.perf_counter()
+        engine.start()
+        for number in range(hours):
+            if number in (3, 6):
+                engine.split()
+                journal.append(today, f"Project {number}", engine.take_intervals())
+            end = now[0] + 3600
+            while now[0] < end:
+                now[0] += rng.choice([1.0, 1.0, 1.3, 2.0, 5.0])  # late and dropped ticks
+                engine.tick()
+                engine.elapsed()
+                ticks += 1
+        engine.stop()
+        journal.append(today, "Default", engine.take_intervals())
+        tick = (time.perf_counter() - start) / ticks
+        start = time.perf_counter()
+        journal.replay()
+        replay = time.perf_counter() - start
+    print(f"timer accounting: {tick * 1e6:.2f} µs per tick, journal replayed in {replay * 1e6:.0f} µs")
+    record("timer_accounting.tick", tick * 1e6, "us")
+    record("timer_accounting.replay", replay * 1e6, "us")
+
+
+def run_instrumentation_overhead(ticks=20000):
+    # a timer tick with instrumentation off and on; see tests/test_app.py
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.pop("HOURS_TRACKING_PROFILE", None)
+    from PyQt5.QtWidgets import QApplication
+    from app import MainWindow
+    from instrumentation import Instrumentation
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    costs = {}
+    with tempfile.TemporaryDirectory() as directory:
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            for enabled in (False, True):
+                window = MainWindow(Instrumentation(enabled, os.path.join(directory, "profile.json")))
+                clock = [0.0]
+                window.timer_engine.clock = lambda: clock[0]
+                window.timer_engine.start()
+                start = time.process_time()
+                for _ in range(ticks):
+                    clock[0] += 1.0
+                    window.update_timer()
+                costs[enabled] = (time.process_time() - start) / ticks
+                window.close()
+                app.processEvents()
+        finally:
+            os.chdir(cwd)
+    print(
+        f"timer tick, instrumentation off: {costs[False] * 1e6:6.1f} us, "
+        f"on: {costs[True] * 1e6:6.1f} us"
+    )
+    record("instrumentation.tick_off", costs[False] * 1e6, "us")
+    record("instrumentation.tick_on", costs[True] * 1e6, "us")
+
+
+def run_month_switching(cycles=5):
+    # flipping through 36 months of history in the table, with a cache of one
+    # month, i.e. reading every month again, and with all of them cached
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication, QTableView
+    from timesheet_model import TimesheetModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    months = [(year, month) for year in range(2015, 2018) for month in range(1, 13)]
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, 3)
+        for cache_size in (1, 36):
+            store = TimesheetStore(JsonStorage(directory), cache_size=cache_size)
+            model = TimesheetModel(store, 2015, 1, "Default", (2015, 1, 1), [5, 6])
+            view = QTableView()
+            view.setModel(model)
+            view.show()
+            for year, month in months:
+                model.set_month(year, month)  # first visit reads every month
+            app.processEvents()
+            rebind = paint = 0
+            for _ in range(cycles):
+                for year, month in months:
+                    start = time.perf_counter()
+                    store.refresh(year, month)
+                    model.set_month(year, month)
+                    rebind += time.perf_counter() - start
+                    app.processEvents()
+                    paint += time.perf_counter() - start
+            switches = cycles * len(months)
+            print(
+                f"month switch, cache of {cache_size:2} months: {rebind / switches * 1000:6.2f} ms to rebind, "
+                f"{paint / switches * 1000:6.2f} ms with painting"
+            )
+            record(f"month_switching.cache_{cache_size}.rebind", rebind / switches * 1000, "ms")
+            record(f"month_switching.cache_{cache_size}.paint", paint / switches * 1000, "ms")
+
+
+def run_two_instances(days=28, checks=10000):
+    # checking whether another store changed a month, when it didn't; two
+    # stores edit the month first, see tests/test_multi_instance.py
+    with tempfile.TemporaryDirectory() as directory:
+        storages = [JsonStorage(directory) for _ in range(2)]
+        stores = [TimesheetStore(storage) for storage in storages]
+        for index in range(days):
+            stores[index % 2].set_seconds(2024, 2, index, 60 * index)
+            stores[index % 2].save()
+        for store in stores:
+            store.refresh(2024, 2)
+        start = time.perf_counter()
+        for _ in range(checks):
+            storages[0].month_changed(2024, 2)
+        check = (time.perf_counter() - start) / checks
+        for storage in storages:
+            storage.close()
+    print(f"two instances: unchanged check {check * 1e6:.1f} µs")
+    record("two_instances.unchanged_check", check * 1e6, "us")
+
+
+class SlowStorage(JsonStorage):
+    # a disk that takes delay seconds for every write, like a network share
+    def __init__(self, directory, delay):
+        super().__init__(directory)
+        self.delay = delay
+        self.writes = 0
+
+    def record(self, year, month, date, day):
+        time.sleep(self.delay)
+        self.writes += 1
+        super().record(year, month, date, day)
+
+
+def run_slow_disk(ticks=30, interval=0.1, delay=0.5):
+    # time a timer tick spends saving on a slow disk, with and without the writer thread
+    from background_writer import BackgroundWriter
+
+    for name in ("direct", "background writer"):
+        with tempfile.TemporaryDirectory() as directory:
+            storage = SlowStorage(directory, delay)
+            backend = BackgroundWriter(storage) if name != "direct" else storage
+            store = TimesheetStore(backend)
+            worst = 0
+            for tick in range(ticks):
+                start = time.perf_counter()
+                store.set_seconds(2024, 1, 0, tick + 1)
+                store.save()
+                blocked = time.perf_counter() - start
+                worst = max(worst, blocked)
+                time.sleep(max(interval - blocked, 0))
+            backend.close()
+            with open(os.path.join(directory, "2024-1.json")) as f:
+                saved = json.load(f)["01/01/2024"]["time_worked"]
+        print(f"slow disk, {name:>17}: longest tick {worst * 1000:7.1f} ms, {storage.writes:2} writes, saved {saved}")
+        record(f"slow_disk.{name.replace(' ', '_')}.longest_tick", worst * 1000, "ms")
+
+
+def run_app_timer_hour(years=10):
+    # an hour of the running timer in the window, saving every second
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    from app import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years, first_year=datetime.date.today().year - years + 1)
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            window = MainWindow()
+            window.show()
+            clock = [0.0]
+            window.timer_engine.clock = lambda: clock[0]
+            window.timer_engine.start()
+            bytes_before = read_io_counters()[0]
+            start = time.process_time()
+            for _ in range(3600):
+                clock[0] += 1.0
+                window.update_timer()
+                app.processEvents()
+            window.writer.flush()
+            cpu = time.process_time() - start
+            written = read_io_counters()[0] - bytes_before
+            window.close()
+        finally:
+            os.chdir(cwd)
+    print(f"one hour of timer in the window: {cpu * 1000:.0f} ms CPU, {written} bytes written")
+    record("app_timer_hour.cpu", cpu * 1000, "ms")
+    record("app_timer_hour.bytes", written, "bytes")
+
+
+def run_edit_to_total(edits=500, years=10):
+    # from typing a time into a cell to the month total and the range subtotals showing it
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtCore import Qt
+    from PyQt5.QtWidgets import QApplication
+    from timesheet_model import MONTH_TOTAL, RangeModel, TimesheetModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        generate_months(directory, years)
+        store = TimesheetStore(JsonStorage(directory))
+        month = TimesheetModel(store, 2016, 3, "Default", (2016, 3, 1), [5, 6])
+        start = time.perf_counter()
+        for _ in range(edits):
+            row = rng.randrange(28)
+            month.setData(month.index(row, 1), f"{rng.randrange(1, 600)}m", Qt.EditRole)
+            month.data(month.index(month.total_row(), 1))
+        month_latency = (time.perf_counter() - start) / edits
+
+        first, last = datetime.date(2015, 1, 1), datetime.date(2015 + years - 1, 12, 31)
+        span = RangeModel(store, first, last, "Default", (2016, 3, 1), [5, 6])
+        start = time.perf_counter()
+        for _ in range(edits):
+            date = first + datetime.timedelta(days=rng.randrange((last - first).days))
+            row = span.row_of(date)
+            span.setData(span.index(row, 1), f"{rng.randrange(1, 600)}m", Qt.EditRole)
+            span.data(span.index(span.row_of(last_of_month(date), MONTH_TOTAL), 1))
+        range_latency = (time.perf_counter() - start) / edits
+    app.processEvents()
+    print(f"edit to total: month table {month_latency * 1e6:.0f} us, range table {range_latency * 1e6:.0f} us")
+    record("edit_to_total.month", month_latency * 1e6, "us")
+    record("edit_to_total.range", range_latency * 1e6, "us")
+
+
+def last_of_month(date):
+    return datetime.date(date.year + date.month // 12, date.month % 12 + 1, 1) - datetime.timedelta(days=1)
+
+
+BENCHMARKS = {
+    "timer_hour": run_timer_hour,
+    "timer_tick": run_timer_tick_cost,
+    "app_timer_hour": run_app_timer_hour,
+    "store_totals": run_store_totals,
+    "startup": run_startup,
+    "month_switching": run_month_switching,
+    "edit_to_total": run_edit_to_total,
+    "graph_redraw": run_graph_redraw,
+    "year_overview": run_year_overview,
+    "backends": run_backends,
+    "binary_months": run_binary_months,
+    "projects": run_projects,
+    "notes_search": run_notes_search,
+    "analytics": run_analytics,
+    "cli_startup": run_cli_startup,
+    "bulk_io": run_bulk_io,
+    "slow_disk": run_slow_disk,
+    "timer_accounting": run_timer_accounting,
+    "instrumentation": run_instrumentation_overhead,
+    "two_instances": run_two_instances,
+}
+
+
+def compare(baseline, threshold):
+    # names of the results that got worse by more than threshold, i.e. higher;
+    # results measured in another unit before, or not at all, are skipped
+    regressions = []
+    for name, result in sorted(RESULTS.items()):
+        old = baseline.get("results", {}).get(name)
+        if old is None or old.get("unit") != result["unit"] or not old["value"]:
+            continue
+        change = result["value"] / old["value"] - 1
+        flag = "REGRESSION" if change > threshold else ""
+        print(f"{name:<45} {old['value']:>12.2f} -> {result['value']:>12.2f} {result['unit']:<6} {change:+7.1%} {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hours tracking dashboard.")
+    parser.add_argument("--only", action="append", choices=sorted(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results of an earlier run to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown flagged as a regression, 0.2 is 20%%")
+    args = parser.parse_args(argv)
+    if not os.path.exists("/proc/self/io"):
+        sys.exit("benchmark.py needs /proc/self/io (Linux)")
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    for name in args.only or BENCHMARKS:
+        BENCHMARKS[name]()
+    if args.json:
+        results = {
+            "created": time.time(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "results": RESULTS,
+        }
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            regressions = compare(json.load(f), args.threshold)
+        if regressions:
+            sys.exit(f"{len(regressions)} regressions")
+
+
+if __name__ == "__main__":
+    main()
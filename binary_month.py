@@ -0,0 +1,235 @@
+import calendar
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from durations import format_duration
+from storage import DEFAULT_PROJECT, JsonStorage, day_entries, temp_path
+
+# An optional compact snapshot of a month, "{year}-{month}.hmonth", for views
+# that read many months at once. All numbers are little-endian:
+#
+#   header      magic "HTMB", version (u16), year (u16), month (u8),
+#               days in the month (u8), number of projects (u16)
+#   flags       one byte per day: PRESENT if the day has an entry, PROJECTS if
+#               it was stored with a "projects" object; padded to 4 bytes
+#   totals      seconds per day over all projects (i32 × days)
+#   projects    seconds per day of each project (i32 × days each), -1 where
+#               the project has no entry on the day
+#   strings     offsets (u32 × count + 1) into UTF-8 text: the project names,
+#               then the notes of each project by day
+#
+# Readers map the file and sum the totals without decoding any notes.
+
+MAGIC = b"HTMB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHBBH")
+PRESENT = 1
+PROJECTS = 2
+NO_ENTRY = -1
+BINARY_MONTH_FILE = re.compile(r"^(\d{4})-(\d{1,2})\.hmonth$")
+
+
+def binary_path(directory, year, month):
+    return os.path.join(directory, f"{year}-{month}.hmonth")
+
+
+def little_endian(values):
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_month(year, month, data):
+    # the bytes of a month as loaded from its JSON files
+    days = calendar.monthrange(year, month)[1]
+    flags = bytearray(days)
+    entries = [{} for _ in range(days)]
+    for date, day in data.items():
+        index = int(date[:2]) - 1
+        if 0 <= index < days:
+            entries[index] = day_entries(day)
+            flags[index] = PRESENT | (PROJECTS if "projects" in day else 0)
+    names = sorted({name for day in entries for name in day})
+
+    totals = array("i", [sum(seconds for seconds, notes in day.values()) for day in entries])
+    seconds = array("i")
+    strings = list(names)
+    for name in names:
+        seconds.extend(day[name][0] if name in day else NO_ENTRY for day in entries)
+        strings.extend(day[name][1] if name in day else "" for day in entries)
+
+    text = [string.encode("utf-8") for string in strings]
+    offsets = array("I", [0])
+    for encoded in text:
+        offsets.append(offsets[-1] + len(encoded))
+
+    flags += bytes(-len(flags) % 4)
+    return b"".join(
+        [
+            HEADER.pack(MAGIC, VERSION, year, month, days, len(names)),
+            bytes(flags),
+            little_endian(totals),
+            little_endian(seconds),
+            little_endian(offsets),
+        ]
+        + text
+    )
+
+
+def write_binary_month(path, year, month, data):
+    # same temp file and rename as write_atomic
+    tmp_path = temp_path(path)
+    with open(tmp_path, "wb") as f:
+        f.write(encode_month(year, month, data))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class BinaryMonth:
+    # A memory-mapped .hmonth file. totals and project_seconds() are views of
+    # the mapped file, notes are decoded when they are asked for. Use it as a
+    # context manager or close() it, which releases the views.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.views = []
+        self.columns = {}
+        try:
+            if len(self.map) < HEADER.size:
+                raise ValueError("month file is truncated")
+            magic, version, self.year, self.month, self.days, count = HEADER.unpack_from(self.map)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"{path} is not a version {VERSION} month file")
+            self.flags = self.view(HEADER.size, self.days)
+            offset = HEADER.size + self.days + -self.days % 4
+            self.totals = self.ints("i", offset, self.days)
+            offset += 4 * self.days
+            self.seconds_offset = offset
+            offset += 4 * self.days * count
+            self.offsets = self.ints("I", offset, count * (self.days + 1) + 1)
+            self.text_offset = offset + 4 * len(self.offsets)
+            self.projects = [self.string(index) for index in range(count)]
+        except Exception:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def view(self, offset, length):
+        view = memoryview(self.map)[offset : offset + length]
+        if len(view) != length:
+            view.release()  # or the map can't be closed
+            raise ValueError("month file is truncated")
+        self.views.append(view)
+        return view
+
+    def ints(self, typecode, offset, count):
+        view = self.view(offset, 4 * count)
+        if sys.byteorder == "little":
+            view = view.cast(typecode)
+            self.views.append(view)
+            return view
+        values = array(typecode, view)
+        values.byteswap()
+        return values
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.columns = {}
+        self.map.close()
+
+    def sum_days(self, first=0, last=None):
+        # seconds over all projects from day index first up to, not including, last
+        return sum(self.totals[first:last])
+
+    def project_seconds(self, name):
+        # seconds per day of a project, -1 on days without an entry
+        if name not in self.columns:
+            index = self.projects.index(name)
+            self.columns[name] = self.ints("i", self.seconds_offset + 4 * self.days * index, self.days)
+        return self.columns[name]
+
+    def string(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return bytes(self.map[self.text_offset + start : self.text_offset + end]).decode("utf-8")
+
+    def note(self, name, index):
+        return self.string(len(self.projects) + self.projects.index(name) * self.days + index)
+
+    def to_json(self):
+        # the month as JsonStorage.load_month returns it
+        data = {}
+        columns = [self.project_seconds(name) for name in self.projects]
+        for index in range(self.days):
+            if not self.flags[index] & PRESENT:
+                continue
+            entries = {
+                name: (seconds[index], self.note(name, index))
+                for name, seconds in zip(self.projects, columns)
+                if seconds[index] != NO_ENTRY
+            }
+            day = {
+                "time_worked": format_duration(self.totals[index]),
+                "notes": entries.get(DEFAULT_PROJECT, (0, ""))[1],
+            }
+            if self.flags[index] & PROJECTS:
+                day["projects"] = {
+                    name: {"time_worked": format_duration(seconds), "notes": notes}
+                    for name, (seconds, notes) in entries.items()
+                }
+            data[f"{index + 1:02d}/{self.month:02d}/{self.year}"] = day
+        return data
+
+
+def binary_months(directory):
+    months = []
+    for filename in os.listdir(directory):
+        match = BINARY_MONTH_FILE.match(filename)
+        if match:
+            months.append((int(match.group(1)), int(match.group(2))))
+    return sorted(months)
+
+
+def convert(directory=".", to_json=False):
+    # write a .hmonth file for every JSON month, or with to_json replace the
+    # JSON months by the contents of the .hmonth files. Months whose JSON
+    # files changed after their .hmonth file was written are left alone, the
+    # .hmonth file is out of date; they are returned as skipped.
+    storage = JsonStorage(directory)
+    converted, skipped = [], []
+    if to_json:
+        for year, month in binary_months(directory):
+            path = binary_path(directory, year, month)
+            if storage.month_mtime(year, month) > os.path.getmtime(path):
+                skipped.append((year, month))
+                continue
+            with BinaryMonth(path) as binary:
+                storage.write_month(year, month, binary.to_json())
+            converted.append((year, month))
+    else:
+        for year, month in storage.stored_months():
+            write_binary_month(binary_path(directory, year, month), year, month, storage.read_month(year, month))
+            converted.append((year, month))
+    storage.close()
+    return converted, skipped
+
+
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if argument != "--to-json"]
+    to_json = "--to-json" in sys.argv[1:]
+    converted, skipped = convert(arguments[0] if arguments else ".", to_json)
+    print(f"Converted {len(converted)} months to {'JSON' if to_json else '.hmonth files'}")
+    for year, month in skipped:
+        print(f"Skipped {year}-{month}, its JSON files are newer than {year}-{month}.hmonth")
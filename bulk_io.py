@@ -0,0 +1,158 @@
+import csv
+import datetime
+import json
+
+from durations import MAX_ENTRY, format_duration, parse_entry
+from storage import DEFAULT_PROJECT, iter_entries
+from timesheet_store import date_key
+
+# Streaming import and export of timesheet entries as CSV or NDJSON. Every
+# step is a generator over single records, so memory use doesn't depend on
+# the size of the archive. Records look like
+#   {"date": "2024-01-31", "project": "Default", "time_worked": "02:00:00", "notes": ""}
+# where "seconds" may be given instead of "time_worked", the date may also be
+# "dd/MM/yyyy" and "project" and "notes" are optional.
+
+FIELDS = ["date", "project", "seconds", "time_worked", "notes"]
+
+
+def read_csv(f):
+    # (line number, record) of a CSV file with a header row
+    reader = csv.DictReader(f)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_ndjson(f):
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_number, None
+        else:
+            yield line_number, record
+
+
+def parse_date(text):
+    if "/" in text:
+        day, month, year = text.split("/")
+        return datetime.date(int(year), int(month), int(day))
+    return datetime.date.fromisoformat(text)
+
+
+def parse_records(rows):
+    # (line number, date, project, seconds, notes) or (line number, error)
+    for line_number, record in rows:
+        if not isinstance(record, dict):
+            yield line_number, "not a JSON object"
+            continue
+        try:
+            date = parse_date(str(record.get("date") or ""))
+        except ValueError:
+            yield line_number, f"bad date {record.get('date')!r}"
+            continue
+        if record.get("seconds") not in (None, ""):
+            try:
+                seconds = int(record["seconds"])
+            except (TypeError, ValueError):
+                seconds = None
+            duration = record["seconds"]
+        else:
+            duration = record.get("time_worked") or ""
+            seconds = parse_entry(str(duration)) if duration else None
+        if seconds is None or seconds < 0:
+            yield line_number, f"bad duration {duration!r}"
+            continue
+        if seconds > MAX_ENTRY:
+            # "time_worked" is capped like typed entries, a number of seconds is refused
+            yield line_number, f"bad duration {duration!r}, more than 24 hours"
+            continue
+        yield line_number, date, record.get("project") or DEFAULT_PROJECT, seconds, record.get("notes") or ""
+
+
+def validate(rows):
+    # dry run: count the good records and collect (line number, error) of the bad ones
+    count = 0
+    errors = []
+    for parsed in parse_records(rows):
+        if len(parsed) == 2:
+            errors.append(parsed)
+        else:
+            count += 1
+    return count, errors
+
+
+def import_records(storage, read_rows, max_buffered=100000):
+    # read_rows() returns the rows from the start, it is called twice: the
+    # whole input is validated first and nothing is written if a record is
+    # bad. Entries are then collected per month and merged into each month
+    # with a single write. A month is written when the input moves on to
+    # another month, so date-sorted archives write every month once; unsorted
+    # input is written in batches of at most max_buffered entries.
+    count, errors = validate(read_rows())
+    if errors:
+        line_number, error = errors[0]
+        raise ValueError(f"line {line_number}: {error}, nothing was imported ({len(errors)} bad records)")
+    pending = {}
+    buffered = 0
+    current = None
+    written = 0
+    for parsed in parse_records(read_rows()):
+        if len(parsed) == 2:
+            raise ValueError(f"line {parsed[0]}: {parsed[1]}")  # the input changed since validating
+        line_number, date, project, seconds, notes = parsed
+        month = (date.year, date.month)
+        if month != current and current in pending:
+            written += write_pending(storage, current, pending.pop(current))
+            buffered = sum(len(entries) for entries in pending.values())
+        current = month
+        pending.setdefault(month, []).append((date.day, project, seconds, notes))
+        buffered += 1
+        if buffered >= max_buffered:
+            for key in list(pending):
+                written += write_pending(storage, key, pending.pop(key))
+            buffered = 0
+    for key in list(pending):
+        written += write_pending(storage, key, pending.pop(key))
+    return written
+
+
+def write_pending(storage, month, entries):
+    # the storage merges the days with what is stored in one locked write
+    year, month = month
+    days = {}
+    for day, project, seconds, notes in entries:
+        days.setdefault(date_key(year, month, day), {})[project] = (seconds, notes)
+    storage.merge_days(year, month, days)
+    return len(entries)
+
+
+def write_csv(f, entries):
+    writer = csv.writer(f)
+    writer.writerow(FIELDS)
+    for date, project, seconds, notes in entries:
+        writer.writerow([date.isoformat(), project, seconds, format_duration(seconds), notes])
+
+
+def write_ndjson(f, entries):
+    for date, project, seconds, notes in entries:
+        record = {"date": date.isoformat(), "project": project, "seconds": seconds, "notes": notes}
+        f.write(json.dumps(record) + "\n")
+
+
+def write_json(f, entries):
+    # a single JSON array, written one entry at a time
+    f.write("[")
+    for number, (date, project, seconds, notes) in enumerate(entries):
+        record = {"date": date.isoformat(), "project": project, "seconds": seconds, "notes": notes}
+        f.write((", " if number else "") + json.dumps(record))
+    f.write("]\n")
+
+
+WRITERS = {"csv": write_csv, "ndjson": write_ndjson, "json": write_json}
+
+
+def export_entries(storage, f, file_format, start, end, project=None):
+    WRITERS[file_format](f, iter_entries(storage, start, end, project))
@@ -0,0 +1,221 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+
+import bulk_io
+from aggregate_index import AggregateIndex
+from analytics import Analytics, format_balance, summary_lines
+from durations import MAX_ENTRY, format_duration, parse_entry
+from storage import DEFAULT_PROJECT, open_storage, write_atomic
+from timesheet_store import TimesheetStore
+
+# Command line access to the timesheet that never imports Qt or matplotlib,
+# e.g. "python cli.py log 2h" or "python cli.py report --week 2024-W05".
+
+TIMER_STATE = "timer-state.json"
+
+
+def parse_date(text):
+    return datetime.date.fromisoformat(text)
+
+
+# argument types, argparse turns their errors into a usage message
+
+
+def parse_month(text):
+    try:
+        first = datetime.date(*map(int, text.split("-")), 1)
+    except (TypeError, ValueError):
+        raise argparse.ArgumentTypeError(f"invalid month {text!r}, use YYYY-MM")
+    return first.year, first.month
+
+
+def parse_week(text):
+    try:
+        year, week = text.split("-W")
+        return datetime.date.fromisocalendar(int(year), int(week), 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid week {text!r}, use YYYY-Www")
+
+
+def last_day(year, month):
+    return datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+
+
+def add_time(store, date, seconds, project, note=None):
+    # add to what is already logged for the day, capped at 24 hours
+    sheet = store.sheet(date.year, date.month)
+    index = date.day - 1
+    total = min(sheet.project_seconds(project, index) + seconds, MAX_ENTRY)
+    store.set_seconds(date.year, date.month, index, total, project)
+    if note is not None:
+        store.set_notes(date.year, date.month, index, note, project)
+    store.save()
+    return total
+
+
+def log(storage, args):
+    seconds = parse_entry(args.duration)
+    if seconds is None:
+        raise SystemExit(f"Can't understand duration {args.duration!r}, use e.g. 90s, 45m, 2h or hh:mm:ss")
+    total = add_time(TimesheetStore(storage), args.date, seconds, args.project, args.note)
+    print(f"{args.date.isoformat()} {args.project}: {format_duration(total)}")
+
+
+def start(storage, args):
+    path = os.path.join(storage.directory, TIMER_STATE)
+    if os.path.exists(path):
+        raise SystemExit("The timer is already running")
+    write_atomic(path, {"started": time.time(), "project": args.project})
+    print(f"Timer started for {args.project}")
+
+
+def stop(storage, args):
+    path = os.path.join(storage.directory, TIMER_STATE)
+    if not os.path.exists(path):
+        raise SystemExit("The timer is not running")
+    with open(path, "r") as f:
+        state = json.load(f)
+    started = datetime.datetime.fromtimestamp(state["started"])
+    seconds = max(int(time.time() - state["started"]), 0)
+    total = add_time(TimesheetStore(storage), started.date(), seconds, state["project"])
+    os.remove(path)
+    print(f"Logged {format_duration(seconds)} for {state['project']}, {format_duration(total)} today")
+
+
+def report(storage, args):
+    if args.week:
+        first = args.week
+        last = first + datetime.timedelta(days=6)
+    else:
+        today = datetime.date.today()
+        year, month = args.month or (today.year, today.month)
+        first = datetime.date(year, month, 1)
+        last = last_day(year, month)
+    total = 0
+    for date, seconds, notes in storage.days_between(first, last, args.project):
+        total += seconds
+        print(f"{date.strftime('%d/%m/%Y')}  {format_duration(seconds):>9}  {notes}")
+    print(f"{'Total':<10}  {format_duration(total):>9}")
+
+
+def summary(storage, args):
+    # expected hours and overtime from the settings, NumPy is only imported here
+    today = datetime.date.today()
+    if args.week:
+        first = args.week
+        last = first + datetime.timedelta(days=6)
+    elif args.start or args.end:
+        first = args.start or datetime.date(*(storage.stored_months() or [(today.year, today.month)])[0], 1)
+        last = args.end or today
+    else:
+        year, month = args.month or (today.year, today.month)
+        first = datetime.date(year, month, 1)
+        last = last_day(year, month)
+    settings = storage.load_settings()
+    max_hours = settings.get("max_hours", 8)
+    index = AggregateIndex(storage)
+    analytics = Analytics(index.month_seconds, max_hours, settings.get("weekend_days", [5, 6]))
+    result = analytics.summary(first, last)
+    print(f"{first.strftime('%d/%m/%Y')} to {result['last'].strftime('%d/%m/%Y')}")
+    for line in summary_lines(result, max_hours):
+        print(line)
+    months = storage.stored_months()
+    if months:
+        overall = analytics.summary(datetime.date(*months[0], 1), today)
+        print(f"Overtime balance over all months {format_balance(overall['balance'])}")
+    index.save()
+
+
+def export(storage, args):
+    months = storage.stored_months()
+    if not months:
+        return
+    first = args.start or datetime.date(months[0][0], months[0][1], 1)
+    last = args.end or last_day(*months[-1])
+    bulk_io.export_entries(storage, sys.stdout, args.format, first, last, args.project)
+
+
+def import_(storage, args):
+    read = bulk_io.read_csv if args.file.endswith(".csv") else bulk_io.read_ndjson
+    with open(args.file, "r", newline="") as f:
+        if args.dry_run:
+            count, errors = bulk_io.validate(read(f))
+            for line_number, error in errors:
+                print(f"{args.file}:{line_number}: {error}")
+            print(f"{count} valid entries, {len(errors)} errors")
+            if errors:
+                raise SystemExit(1)
+            return
+
+        def rows():
+            f.seek(0)
+            return read(f)
+
+        try:
+            count = bulk_io.import_records(storage, rows)
+        except ValueError as error:
+            raise SystemExit(f"{args.file}: {error}")
+    print(f"Imported {count} entries")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Log and report worked hours without the GUI.")
+    parser.add_argument("--directory", default=".", help="directory with the timesheet data")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("log", help="add time to a day")
+    command.add_argument("duration", help="e.g. 90s, 45m, 2h or hh:mm:ss")
+    command.add_argument("--date", type=parse_date, default=datetime.date.today(), help="YYYY-MM-DD, today by default")
+    command.add_argument("--project", default=DEFAULT_PROJECT)
+    command.add_argument("--note", help="replace the notes of the day")
+    command.set_defaults(run=log)
+
+    command = commands.add_parser("start", help="start the timer")
+    command.add_argument("--project", default=DEFAULT_PROJECT)
+    command.set_defaults(run=start)
+
+    command = commands.add_parser("stop", help="stop the timer and log its time")
+    command.set_defaults(run=stop)
+
+    command = commands.add_parser("report", help="daily and total hours of a month or a week")
+    command.add_argument("--month", type=parse_month, help="YYYY-MM, the current month by default")
+    command.add_argument("--week", type=parse_week, help="ISO week as YYYY-Www")
+    command.add_argument("--project", help="only this project")
+    command.set_defaults(run=report)
+
+    command = commands.add_parser("summary", help="expected hours, overtime balance, averages and streaks")
+    command.add_argument("--month", type=parse_month, help="YYYY-MM, the current month by default")
+    command.add_argument("--week", type=parse_week, help="ISO week as YYYY-Www")
+    command.add_argument("--from", dest="start", type=parse_date, help="first day, YYYY-MM-DD")
+    command.add_argument("--to", dest="end", type=parse_date, help="last day, YYYY-MM-DD, today by default")
+    command.set_defaults(run=summary)
+
+    command = commands.add_parser("export", help="write all entries as CSV, NDJSON or JSON")
+    command.add_argument("--format", choices=sorted(bulk_io.WRITERS), default="csv")
+    command.add_argument("--from", dest="start", type=parse_date, help="first day, YYYY-MM-DD")
+    command.add_argument("--to", dest="end", type=parse_date, help="last day, YYYY-MM-DD")
+    command.add_argument("--project", help="only this project")
+    command.set_defaults(run=export)
+
+    command = commands.add_parser("import", help="merge entries from a .csv or .ndjson file")
+    command.add_argument("file")
+    command.add_argument("--dry-run", action="store_true", help="only check the file and report bad lines")
+    command.set_defaults(run=import_)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    storage = open_storage(args.directory)
+    try:
+        args.run(storage, args)
+    finally:
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QDialog, QLabel, QTableWidget, QTableWidgetItem, QVBoxLayout
+
+COLUMNS = ["count", "mean", "p50", "p90", "p99", "max"]
+
+
+class DebugDialog(QDialog):
+    # live view of the instrumentation histograms, opened with Ctrl+Shift+D
+    def __init__(self, instrumentation):
+        super().__init__()
+        self.instrumentation = instrumentation
+        self.setWindowTitle("Instrumentation")
+        self.resize(700, 300)
+
+        layout = QVBoxLayout()
+        if instrumentation.enabled:
+            text = f"Times in microseconds, bytes in bytes. Written to {instrumentation.dump_path} on exit."
+        else:
+            text = "Instrumentation is off, start with --profile or set HOURS_TRACKING_PROFILE=1."
+        layout.addWidget(QLabel(text))
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+        self.refresh_timer = QTimer()
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(1000)
+        self.refresh()
+
+    def refresh(self):
+        stats = self.instrumentation.stats()
+        self.table.setRowCount(len(stats))
+        self.table.setVerticalHeaderLabels(list(stats))
+        for row, values in enumerate(stats.values()):
+            for column, key in enumerate(COLUMNS):
+                self.table.setItem(row, column, QTableWidgetItem(f"{values[key]:.0f}"))
@@ -0,0 +1,35 @@
+def format_duration(seconds):
+    return "{:02d}:{:02d}:{:02d}".format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def parse_duration(text):
+    # "hh:mm:ss" as stored in the month files, hours may exceed 24
+    if not text:
+        return 0
+    hours, minutes, seconds = text.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+MAX_ENTRY = 24 * 3600
+
+
+def parse_entry(text):
+    # time typed by the user: "90s", "45m", "2h" or "hh:mm:ss", capped at
+    # 24 hours. An empty entry clears the day. Returns None if not understood.
+    text = text.strip()
+    if text == "":
+        return 0
+    try:
+        if text[-1] == "s":
+            seconds = int(text[:-1])
+        elif text[-1] == "m":
+            seconds = int(text[:-1]) * 60
+        elif text[-1] == "h":
+            seconds = int(text[:-1]) * 3600
+        else:
+            seconds = parse_duration(text)
+    except ValueError:
+        return None
+    if seconds < 0:
+        return None
+    return min(seconds, MAX_ENTRY)
@@ -0,0 +1,57 @@
+class HoursGraph:
+    # Bar chart of the hours worked per day, or a heatmap of a whole year.
+    # matplotlib and seaborn are only imported when the first graph is created,
+    # which keeps them out of the application start up. Later redraws of the
+    # same shape only change the heights of the bars or the heatmap data.
+    def __init__(self):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+        from matplotlib.figure import Figure
+        import seaborn as sns
+
+        self.sns = sns
+        sns.set_style("whitegrid")
+        self.figure = Figure()
+        self.canvas = FigureCanvasQTAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.bars = None
+        self.image = None
+
+    def plot(self, worked):
+        if self.bars is not None and len(self.bars) == len(worked):
+            for bar, hours in zip(self.bars, worked):
+                bar.set_height(hours)
+            self.axes.relim()
+            self.axes.autoscale_view()
+        else:
+            self.axes.clear()
+            self.image = None
+            self.sns.barplot(x=range(1, len(worked) + 1), y=worked, color="lightblue", ax=self.axes)
+            self.bars = list(self.axes.patches)
+            self.axes.set_title("Hours Worked Over the Month")
+            self.axes.set_xlabel("Days in Current Month")
+            self.axes.set_ylabel("Hours Worked")
+        self.canvas.draw_idle()
+
+    def plot_year(self, year, days):
+        import numpy as np
+
+        # one column per week, Monday at the top, days outside the year empty
+        offset = days[0][0].weekday()
+        grid = np.full((7, (offset + len(days) + 6) // 7), np.nan)
+        for number, (date, seconds) in enumerate(days):
+            grid[(offset + number) % 7, (offset + number) // 7] = seconds / 3600
+        most = max(np.nanmax(grid), 1)
+        if self.image is not None and self.image.get_array().shape == grid.shape:
+            self.image.set_data(grid)
+            self.image.set_clim(0, most)
+        else:
+            self.axes.clear()
+            self.bars = None
+            self.image = self.axes.imshow(grid, cmap="Greens", aspect="auto", vmin=0, vmax=most)
+            self.axes.grid(False)
+            self.axes.set_yticks(range(7))
+            self.axes.set_yticklabels(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"])
+            self.axes.set_xlabel("Week of the Year")
+            self.axes.set_ylabel("")
+        self.axes.set_title(f"Hours Worked in {year}")
+        self.canvas.draw_idle()
@@ -0,0 +1,140 @@
+import functools
+import inspect
+import os
+import time
+
+from storage import write_atomic
+
+# Optional profiling of the application, switched on by setting
+# HOURS_TRACKING_PROFILE (to 1, or to the file to write the results to) or by
+# starting it with --profile[=PATH]. The results are written as JSON on exit,
+# to profile.json unless a path was given.
+
+ENVIRONMENT_VARIABLE = "HOURS_TRACKING_PROFILE"
+DEFAULT_DUMP_PATH = "profile.json"
+
+
+def bytes_written():
+    # bytes passed to write calls by this process so far, None where unknown
+    try:
+        with open("/proc/self/io", "r") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+
+
+class Histogram:
+    # Counts of values in power of two buckets, e.g. of microseconds, which
+    # bounds percentiles to within a factor of two at a fixed size.
+    def __init__(self):
+        self.buckets = [0] * 48
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.buckets[min(int(value).bit_length(), len(self.buckets) - 1)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        # upper bound of the bucket holding the given fraction of the values
+        seen = 0
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= fraction * self.count:
+                return min((1 << bucket) - 1, self.max)
+        return 0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+
+class Instrumentation:
+    # Histograms by name: durations of instrumented methods in microseconds,
+    # bytes written and event loop lateness. When disabled, wrap() and
+    # count_bytes() leave the objects alone, so there is nothing to pay.
+    def __init__(self, enabled=False, dump_path=DEFAULT_DUMP_PATH):
+        self.enabled = enabled
+        self.dump_path = dump_path
+        self.histograms = {}
+        self.started = time.time()
+
+    @classmethod
+    def from_arguments(cls, argv):
+        # set up from the environment and --profile[=PATH], which is removed from argv
+        path = os.environ.get(ENVIRONMENT_VARIABLE)
+        for argument in list(argv[1:]):
+            if argument == "--profile" or argument.startswith("--profile="):
+                argv.remove(argument)
+                path = argument.partition("=")[2] or "1"
+        if not path or path == "0":
+            return cls()
+        return cls(True, DEFAULT_DUMP_PATH if path == "1" else path)
+
+    def histogram(self, name):
+        if name not in self.histograms:
+            self.histograms[name] = Histogram()
+        return self.histograms[name]
+
+    def wrap(self, target, names):
+        # time the methods of an object; call before connecting them to signals
+        if self.enabled:
+            for name in names:
+                setattr(target, name, self.timed(name, getattr(target, name)))
+
+    def timed(self, name, function):
+        histogram = self.histogram(name)
+        # Qt passes signal arguments that slots without them don't take
+        parameters = inspect.signature(function).parameters.values()
+        if any(parameter.kind == parameter.VAR_POSITIONAL for parameter in parameters):
+            count = None
+        else:
+            count = sum(parameter.kind != parameter.KEYWORD_ONLY for parameter in parameters)
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args[:count], **kwargs)
+            finally:
+                histogram.add((time.perf_counter() - start) * 1000000)
+
+        return timed
+
+    def count_bytes(self, target, names, histogram_name="bytes written"):
+        # bytes written by the process during each call of the methods
+        if not self.enabled or bytes_written() is None:
+            return
+        histogram = self.histogram(histogram_name)
+        for name in names:
+            function = getattr(target, name)
+
+            def counted(*args, function=function, **kwargs):
+                before = bytes_written()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.add(bytes_written() - before)
+
+            setattr(target, name, functools.wraps(function)(counted))
+
+    def stats(self):
+        return {name: self.histograms[name].to_dict() for name in sorted(self.histograms)}
+
+    def dump(self):
+        if self.enabled:
+            write_atomic(
+                self.dump_path,
+                {"started": self.started, "seconds": time.time() - self.started, "histograms": self.stats()},
+            )
@@ -0,0 +1,25 @@
+import os
+import sys
+
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+
+
+def migrate(directory="."):
+    # one-shot import of the month JSON files and settings.json into
+    # timesheet.db; the app uses the database from then on
+    if os.path.exists(os.path.join(directory, "timesheet.db")):
+        raise SystemExit(f"{os.path.join(directory, 'timesheet.db')} already exists")
+    source = JsonStorage(directory)
+    target = SqliteStorage(directory)
+    months = source.stored_months()
+    for year, month in months:
+        target.save_month(year, month, source.read_month(year, month))
+    target.save_settings(source.load_settings())
+    target.close()
+    return months
+
+
+if __name__ == "__main__":
+    months = migrate(sys.argv[1] if len(sys.argv) > 1 else ".")
+    print(f"Imported {len(months)} months into timesheet.db")
@@ -0,0 +1,136 @@
+import datetime
+import json
+import os
+import re
+import time
+from bisect import bisect_left
+
+from storage import write_atomic
+from timesheet_store import MonthSheet
+
+WORD = re.compile(r"\w+")
+
+
+def words(text):
+    return set(WORD.findall(text.lower()))
+
+
+class NotesIndex:
+    # Inverted index from the words of the notes to the days and projects
+    # whose notes contain them, over every stored month. The notes are kept
+    # in a sidecar file that the index is rebuilt from, so searching never
+    # opens the month files; like the AggregateIndex, months whose files are
+    # newer than the index are re-read once. Months are updated from the store
+    # whenever they are saved or reloaded, re-indexing only the days whose
+    # notes changed.
+    def __init__(self, storage, filename="notes-index.json"):
+        self.storage = storage
+        self.path = os.path.join(storage.directory, filename)
+        # {(year, month): (updated, {(day index, project): notes})}
+        self.months = None
+        # {word: {(year, month, day index, project)}}
+        self.postings = {}
+        self.sorted_words = []
+        self.dirty = False
+        self.refreshed = False
+
+    def load(self):
+        self.months = {}
+        self.postings = {}
+        self.sorted_words = None
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    months = json.load(f)["months"]
+            except (ValueError, KeyError):
+                months = {}  # rebuilt on refresh
+            for key, (updated, entries) in months.items():
+                year, month = map(int, key.split("-"))
+                notes = {(index, project): text for index, project, text in entries}
+                self.months[(year, month)] = (updated, notes)
+                for (index, project), text in notes.items():
+                    self.add_words((year, month, index, project), words(text))
+
+    def ensure_loaded(self):
+        if self.months is None:
+            self.load()
+
+    def refresh(self):
+        # re-read the months whose files are newer than the index
+        self.ensure_loaded()
+        for year, month in self.storage.stored_months():
+            entry = self.months.get((year, month))
+            if entry is None or self.storage.month_mtime(year, month) > entry[0]:
+                sheet = MonthSheet(year, month)
+                sheet.load(self.storage.read_month(year, month))
+                self.update_month(sheet)
+        self.refreshed = True
+
+    def update_month(self, sheet):
+        self.ensure_loaded()
+        key = (sheet.year, sheet.month)
+        previous = self.months.get(key, (0, {}))[1]
+        notes = {}
+        for name, project in sheet.projects.items():
+            for index, text in enumerate(project.notes):
+                if text:
+                    notes[(index, name)] = text
+        for entry in previous.keys() | notes.keys():
+            old, new = previous.get(entry, ""), notes.get(entry, "")
+            if old != new:
+                old_words, new_words = words(old), words(new)
+                self.remove_words(key + entry, old_words - new_words)
+                self.add_words(key + entry, new_words - old_words)
+        self.months[key] = (time.time(), notes)
+        self.dirty = True
+
+    def add_words(self, entry, added):
+        for word in added:
+            if word not in self.postings:
+                self.postings[word] = set()
+                self.sorted_words = None
+            self.postings[word].add(entry)
+
+    def remove_words(self, entry, removed):
+        for word in removed:
+            entries = self.postings[word]
+            entries.discard(entry)
+            if not entries:
+                del self.postings[word]
+                self.sorted_words = None
+
+    def words_with_prefix(self, prefix):
+        if self.sorted_words is None:
+            self.sorted_words = sorted(self.postings)
+        position = bisect_left(self.sorted_words, prefix)
+        while position < len(self.sorted_words) and self.sorted_words[position].startswith(prefix):
+            yield self.sorted_words[position]
+            position += 1
+
+    def search(self, query):
+        # (date, project, notes) of the entries whose notes have a word
+        # starting with every word of the query, by date
+        if not self.refreshed:
+            self.refresh()
+        matches = None
+        for prefix in sorted(words(query), key=len, reverse=True):
+            found = set()
+            for word in self.words_with_prefix(prefix):
+                found |= self.postings[word]
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        results = []
+        for year, month, index, project in matches or ():
+            notes = self.months[(year, month)][1][(index, project)]
+            results.append((datetime.date(year, month, index + 1), project, notes))
+        return sorted(results)
+
+    def save(self):
+        if self.dirty:
+            months = {
+                f"{year}-{month}": [updated, [[index, project, text] for (index, project), text in notes.items()]]
+                for (year, month), (updated, notes) in self.months.items()
+            }
+            write_atomic(self.path, {"months": months})
+            self.dirty = False
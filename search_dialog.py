@@ -0,0 +1,62 @@
+import time
+
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QDialog, QLabel, QLineEdit, QTableWidget, QTableWidgetItem, QVBoxLayout
+
+MAX_RESULTS = 500
+
+
+class SearchDialog(QDialog):
+    # searches the notes of all months as the query is typed, opened with
+    # Ctrl+F; activating a result shows its day in the main window
+    day_activated = pyqtSignal(object, str)
+
+    def __init__(self, notes_index):
+        super().__init__()
+        self.notes_index = notes_index
+        self.results = []
+        self.setWindowTitle("Search Notes")
+        self.resize(700, 400)
+
+        layout = QVBoxLayout()
+        self.query_edit = QLineEdit()
+        self.query_edit.setPlaceholderText("Words or beginnings of words, e.g. \"rev client\"")
+        self.query_edit.textChanged.connect(self.search)
+        self.query_edit.returnPressed.connect(self.activate_first)
+        layout.addWidget(self.query_edit)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.table = QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Date", "Project", "Notes"])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.cellActivated.connect(self.activate)
+        layout.addWidget(self.table)
+        self.setLayout(layout)
+
+    def search(self, query):
+        start = time.perf_counter()
+        self.results = self.notes_index.search(query) if query.strip() else []
+        elapsed = time.perf_counter() - start
+        shown = self.results[-MAX_RESULTS:]
+        self.table.setRowCount(len(shown))
+        # the latest days first
+        for row, (date, project, notes) in enumerate(reversed(shown)):
+            self.table.setItem(row, 0, QTableWidgetItem(date.strftime("%d/%m/%Y")))
+            self.table.setItem(row, 1, QTableWidgetItem(project))
+            self.table.setItem(row, 2, QTableWidgetItem(notes))
+        if query.strip():
+            more = f", showing the latest {MAX_RESULTS}" if len(self.results) > MAX_RESULTS else ""
+            found = "1 day" if len(self.results) == 1 else f"{len(self.results)} days"
+            self.status_label.setText(f"{found} found in {elapsed * 1000:.1f} ms{more}")
+        else:
+            self.status_label.clear()
+
+    def activate(self, row, column=0):
+        date, project, notes = self.results[len(self.results) - 1 - row]
+        self.day_activated.emit(date, project)
+
+    def activate_first(self):
+        if self.results:
+            self.activate(0)
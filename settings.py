@@ -1,13 +1,12 @@
 from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QVBoxLayout
 from PyQt5.QtWidgets import QDialog, QDialogButtonBox, QVBoxLayout, QCheckBox, QLabel, QSpinBox
 from PyQt5.QtWidgets import QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QCheckBox
-import json
-import os
 
 
 class SettingsWindow(QDialog):
-    def __init__(self):
+    def __init__(self, storage):
         super().__init__()
+        self.storage = storage
         self.setup_ui()
 
     def setup_ui(self):
@@ -47,9 +46,8 @@ class SettingsWindow(QDialog):
         self.setLayout(layout)
 
         # Load settings from file or database
-        if os.path.exists("settings.json"):
-            with open("settings.json", "r") as f:
-                settings = json.load(f)
+        settings = self.storage.load_settings()
+        if "max_hours" in settings:
             self.max_hours_input.setValue(settings["max_hours"])
             selected_days = settings["weekend_days"]
             for day in selected_days:
@@ -58,9 +56,8 @@ class SettingsWindow(QDialog):
                 checkbox.setChecked(True)
         else:
             # Create default settings
-            settings = {"max_hours": 8, "weekend_days": [5, 6]}
-            with open("settings.json", "w") as f:
-                json.dump(settings, f)
+            settings.update(max_hours=8, weekend_days=[5, 6])
+            self.storage.save_settings(settings)
             for day in settings["weekend_days"]:
                 # Set checkbox to checked in the table's row for the day
                 checkbox = self.table.cellWidget(day, 1)
@@ -74,8 +71,8 @@ class SettingsWindow(QDialog):
             checkbox = self.table.cellWidget(i, 1)
             if checkbox.isChecked():
                 selected_days.append(i)
-        # Save settings to file or database
-        settings = {"max_hours": max_hours, "weekend_days": selected_days}
-        with open("settings.json", "w") as f:
-            json.dump(settings, f)
+        # Save settings to file or database, keeping keys this dialog doesn't edit
+        settings = self.storage.load_settings()
+        settings.update(max_hours=max_hours, weekend_days=selected_days)
+        self.storage.save_settings(settings)
         self.accept()
@@ -0,0 +1,227 @@
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from storage import DEFAULT_PROJECT, day_entries, make_day
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    date TEXT NOT NULL,
+    project TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    notes TEXT NOT NULL,
+    PRIMARY KEY (date, project)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_by_project ON entries (project, date);
+CREATE TABLE IF NOT EXISTS months (
+    year INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    updated REAL NOT NULL,
+    PRIMARY KEY (year, month)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def iso_date(date):
+    # "dd/MM/yyyy" from the month files to "yyyy-mm-dd", which sorts by date
+    return f"{date[6:]}-{date[3:5]}-{date[:2]}"
+
+
+def month_range(year, month):
+    next_year, next_month = year + month // 12, month % 12 + 1
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+
+class SqliteStorage:
+    # Same interface as JsonStorage, backed by timesheet.db in WAL mode with
+    # one row per day and project keyed by the ISO date. Every change, or
+    # batch() of changes, is committed in its own short transaction, so other
+    # instances using the database are never locked out for long; they wait
+    # up to busy_timeout seconds for it. flush_interval is accepted for the
+    # JsonStorage interface, there is nothing left to flush.
+    def __init__(self, directory=".", flush_interval=60, filename="timesheet.db", busy_timeout=10):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.filename = filename
+        path = os.path.join(directory, filename)
+        # transactions are begun explicitly, see transaction(); the GUI writes
+        # from a background thread, see BackgroundWriter
+        self.connection = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.upgrade()
+        # settings, the list of months and their mtimes are read through a
+        # second connection, so they don't wait for a thread that is writing
+        self.reader = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        # months.updated of each month when last read or written here, and the
+        # months another connection changed since
+        self.seen = {}
+        self.stale = set()
+        self.settings_seen = None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two instances
+        # can't both read and then fail to write; nested uses join the outer one
+        if self.connection.in_transaction:
+            yield
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+
+    def batch(self):
+        return self.transaction()
+
+    def upgrade(self):
+        # databases from before projects had a "days" table without them
+        tables = [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        if "days" in tables:
+            with self.transaction():
+                self.connection.execute(
+                    "INSERT OR IGNORE INTO entries SELECT date, ?, seconds, notes FROM days", (DEFAULT_PROJECT,)
+                )
+                self.connection.execute("DROP TABLE days")
+
+    def read_settings(self):
+        rows = self.reader.execute("SELECT key, value FROM settings ORDER BY key").fetchall()
+        return rows, hashlib.sha1(json.dumps(rows).encode()).hexdigest()
+
+    def load_settings(self):
+        rows, self.settings_seen = self.read_settings()
+        return {key: json.loads(value) for key, value in rows}
+
+    def save_settings(self, settings):
+        with self.transaction():
+            self.connection.execute("DELETE FROM settings")
+            self.connection.executemany(
+                "INSERT INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value)) for key, value in settings.items()],
+            )
+        self.settings_seen = self.read_settings()[1]
+
+    def settings_changed(self):
+        # whether another connection saved different settings since they
+        # were loaded or saved here
+        return self.settings_seen is not None and self.read_settings()[1] != self.settings_seen
+
+    def watch_paths(self, months):
+        path = os.path.join(self.directory, self.filename)
+        return [path for path in (self.directory, path, path + "-wal") if os.path.exists(path)]
+
+    def stored_months(self):
+        return [tuple(row) for row in self.reader.execute("SELECT year, month FROM months ORDER BY year, month")]
+
+    def month_mtime(self, year, month):
+        return self.updated(self.reader, year, month)
+
+    def updated(self, connection, year, month):
+        row = connection.execute("SELECT updated FROM months WHERE year = ? AND month = ?", (year, month)).fetchone()
+        return row[0] if row else 0
+
+    def read_month(self, year, month):
+        days = {}
+        rows = self.connection.execute(
+            "SELECT date, project, seconds, notes FROM entries WHERE date >= ? AND date < ?",
+            month_range(year, month),
+        )
+        for date, project, seconds, notes in rows:
+            days.setdefault(f"{date[8:]}/{date[5:7]}/{date[:4]}", {})[project] = (seconds, notes)
+        return {date: make_day(entries) for date, entries in days.items()}
+
+    def load_month(self, year, month):
+        self.seen[(year, month)] = self.updated(self.connection, year, month)
+        self.stale.discard((year, month))
+        return self.read_month(year, month)
+
+    def month_changed(self, year, month):
+        # whether another connection changed the month since it was loaded
+        # here; within a transaction the months row includes its own changes
+        key = (year, month)
+        if key in self.seen and self.updated(self.connection, year, month) != self.seen[key]:
+            self.stale.add(key)
+        return key in self.stale
+
+    def days_between(self, start, end, project=None):
+        if project is None:
+            rows = self.connection.execute(
+                "SELECT date, SUM(seconds), MAX(CASE WHEN project = ? THEN notes ELSE '' END) FROM entries "
+                "WHERE date >= ? AND date <= ? GROUP BY date ORDER BY date",
+                (DEFAULT_PROJECT, start.isoformat(), end.isoformat()),
+            )
+        else:
+            rows = self.connection.execute(
+                "SELECT date, seconds, notes FROM entries WHERE project = ? AND date >= ? AND date <= ? ORDER BY date",
+                (project, start.isoformat(), end.isoformat()),
+            )
+        for date, seconds, notes in rows:
+            yield datetime.date.fromisoformat(date), seconds, notes
+
+    def save_month(self, year, month, data):
+        with self.transaction():
+            self.connection.execute("DELETE FROM entries WHERE date >= ? AND date < ?", month_range(year, month))
+            for date, day in data.items():
+                self.write_day(date, day)
+            self.touch_month(year, month)
+
+    def merge_days(self, year, month, days):
+        # set entries of days, {date: {project: (seconds, notes)}}, keeping the
+        # other projects of those days
+        with self.transaction():
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO entries (date, project, seconds, notes) VALUES (?, ?, ?, ?)",
+                [
+                    (iso_date(date), project, seconds, notes)
+                    for date, entries in days.items()
+                    for project, (seconds, notes) in entries.items()
+                ],
+            )
+            self.touch_month(year, month)
+
+    def write_month(self, year, month, data):
+        self.save_month(year, month, data)
+
+    def record(self, year, month, date, day):
+        with self.transaction():
+            self.write_day(date, day)
+            self.touch_month(year, month)
+
+    def write_day(self, date, day):
+        self.connection.execute("DELETE FROM entries WHERE date = ?", (iso_date(date),))
+        if day is not None:
+            self.connection.executemany(
+                "INSERT INTO entries (date, project, seconds, notes) VALUES (?, ?, ?, ?)",
+                [
+                    (iso_date(date), project, seconds, notes)
+                    for project, (seconds, notes) in day_entries(day).items()
+                ],
+            )
+
+    def touch_month(self, year, month):
+        self.month_changed(year, month)
+        updated = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO months (year, month, updated) VALUES (?, ?, ?)", (year, month, updated)
+        )
+        self.seen[(year, month)] = updated
+
+    def flush(self, year=None, month=None):
+        # every change is committed when it is made
+        pass
+
+    def close(self):
+        self.reader.close()
+        self.connection.close()
@@ -0,0 +1,396 @@
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from durations import format_duration, parse_duration
+
+try:
+    import fcntl
+except ImportError:  # Windows, instances don't lock each other out
+    fcntl = None
+
+
+MONTH_FILE = re.compile(r"^(\d{4})-(\d{1,2})\.(?:json|journal)$")
+DEFAULT_PROJECT = "Default"
+
+
+def temp_path(path):
+    # next to the target, and of its own for every process and thread, so
+    # instances writing the same file at once don't truncate each other's
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+def write_atomic(path, data):
+    # write to a temp file next to the target and rename it over, so a crash
+    # leaves either the old or the new file but never a truncated one
+    tmp_path = temp_path(path)
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def open_storage(directory=".", flush_interval=60):
+    # a timesheet.db created by migrate.py switches the app over to SQLite
+    if os.path.exists(os.path.join(directory, "timesheet.db")):
+        from sqlite_storage import SqliteStorage
+
+        return SqliteStorage(directory, flush_interval)
+    return JsonStorage(directory, flush_interval)
+
+
+def months_between(start, end):
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = year + month // 12, month % 12 + 1
+
+
+def day_entries(day):
+    # {project: (seconds, notes)} of a day from a month file. Days written
+    # before there were projects belong to the default project.
+    if "projects" in day:
+        return {
+            project: (parse_duration(entry["time_worked"]), entry["notes"])
+            for project, entry in day["projects"].items()
+        }
+    return {DEFAULT_PROJECT: (parse_duration(day["time_worked"]), day["notes"])}
+
+
+def make_day(entries):
+    # the opposite of day_entries; "time_worked" is the total of all projects
+    # and days with only the default project keep the old format
+    if not entries:
+        return None
+    if list(entries) == [DEFAULT_PROJECT]:
+        seconds, notes = entries[DEFAULT_PROJECT]
+        return {"time_worked": format_duration(seconds), "notes": notes}
+    return {
+        "time_worked": format_duration(sum(seconds for seconds, notes in entries.values())),
+        "notes": entries.get(DEFAULT_PROJECT, (0, ""))[1],
+        "projects": {
+            project: {"time_worked": format_duration(seconds), "notes": notes}
+            for project, (seconds, notes) in entries.items()
+        },
+    }
+
+
+def iter_entries(storage, start, end, project=None):
+    # (date, project, seconds, notes) of every entry from start to end inclusive
+    for year, month in months_between(start, end):
+        data = storage.read_month(year, month)
+        for date in sorted(data, key=lambda date: date[:2]):
+            day = datetime.date(year, month, int(date[:2]))
+            if not start <= day <= end:
+                continue
+            for name, (seconds, notes) in day_entries(data[date]).items():
+                if project is None or name == project:
+                    yield day, name, seconds, notes
+
+
+def apply_record(data, record):
+    date = record["date"]
+    if "time_worked" in record:
+        data[date] = {key: value for key, value in record.items() if key not in ("date", "updated")}
+    else:
+        data.pop(date, None)
+
+
+class JsonStorage:
+    # Every month is kept in a "{year}-{month}.json" snapshot. Changes to single
+    # days are appended to "{year}-{month}.journal" and only folded back into the
+    # snapshot every flush_interval seconds, on flush() and on close().
+    #
+    # Several instances, also in other processes, can share the directory. The
+    # files are only read and written while holding an advisory lock on
+    # "timesheet.lock". Journal records carry the time they were made and are
+    # replayed last-write-wins per day, and compaction merges the files as they
+    # are on disk, so every instance's changes to a day end up in the snapshot.
+    def __init__(self, directory=".", flush_interval=60, clock=time.monotonic):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.months = {}
+        self.journals = {}
+        self.first_change = {}
+        # (file stats, content hash or None) of each month when last read or
+        # written here, and the months another instance changed since
+        self.seen = {}
+        self.stale = set()
+        # the same for settings.json
+        self.settings_seen = None
+        self.lock_file = None
+
+    @contextlib.contextmanager
+    def locked(self, exclusive=True):
+        # not reentrant, the lock is released when the outermost use ends
+        if fcntl is None:
+            yield
+            return
+        if self.lock_file is None:
+            self.lock_file = open(os.path.join(self.directory, "timesheet.lock"), "a")
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def batch(self):
+        # every record is locked and written on its own
+        return contextlib.nullcontext()
+
+    def snapshot_path(self, year, month):
+        return os.path.join(self.directory, f"{year}-{month}.json")
+
+    def journal_path(self, year, month):
+        return os.path.join(self.directory, f"{year}-{month}.journal")
+
+    def settings_path(self):
+        return os.path.join(self.directory, "settings.json")
+
+    def load_settings(self):
+        # settings.json is only ever replaced whole, so it is read without the
+        # lock, which a thread writing months may be holding
+        path = self.settings_path()
+        signature = self.file_signature(path)
+        content = self.read_file(path)
+        self.settings_seen = (signature, self.digest(content, None))
+        return json.loads(content) if content else {}
+
+    def save_settings(self, settings):
+        with self.locked():
+            write_atomic(self.settings_path(), settings)
+            path = self.settings_path()
+            self.settings_seen = (self.file_signature(path), self.digest(self.read_file(path), None))
+
+    def settings_changed(self):
+        # whether another instance saved different settings since they were
+        # loaded or saved here, hashed only when the stats differ
+        if self.settings_seen is None:
+            return False
+        signature, digest = self.settings_seen
+        path = self.settings_path()
+        current = self.file_signature(path)
+        if current == signature:
+            return False
+        if self.digest(self.read_file(path), None) != digest:
+            return True
+        self.settings_seen = (current, digest)
+        return False
+
+    def watch_paths(self, months):
+        # files whose changes by other instances concern the given months
+        paths = [self.directory, self.settings_path()]
+        for year, month in months:
+            paths += [self.snapshot_path(year, month), self.journal_path(year, month)]
+        return [path for path in paths if os.path.exists(path)]
+
+    def stored_months(self):
+        months = []
+        for filename in os.listdir(self.directory):
+            match = MONTH_FILE.match(filename)
+            if match:
+                months.append((int(match.group(1)), int(match.group(2))))
+        return sorted(set(months))
+
+    def month_mtime(self, year, month):
+        # last time the month changed on disk, including uncompacted changes
+        mtime = 0
+        for path in (self.snapshot_path(year, month), self.journal_path(year, month)):
+            if os.path.exists(path):
+                mtime = max(mtime, os.path.getmtime(path))
+        return mtime
+
+    def load_month(self, year, month):
+        with self.locked(exclusive=False):
+            snapshot, journal = self.read_files(year, month)
+            self.seen[(year, month)] = (self.signature(year, month), self.digest(snapshot, journal))
+        self.stale.discard((year, month))
+        data = self.parse_files(snapshot, journal)
+        self.months[(year, month)] = data
+        return {date: dict(day) for date, day in data.items()}
+
+    def read_month(self, year, month):
+        with self.locked(exclusive=False):
+            snapshot, journal = self.read_files(year, month)
+        return self.parse_files(snapshot, journal)
+
+    def read_files(self, year, month):
+        return [self.read_file(self.snapshot_path(year, month)), self.read_file(self.journal_path(year, month))]
+
+    def read_file(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def parse_files(self, snapshot, journal):
+        data = json.loads(snapshot) if snapshot else {}
+        # replay changes that were not compacted yet, e.g. after a crash
+        if journal:
+            updated = {}
+            for line in journal.splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn write
+                if record.get("updated", 0) >= updated.get(record["date"], 0):
+                    updated[record["date"]] = record.get("updated", 0)
+                    apply_record(data, record)
+        return data
+
+    def digest(self, snapshot, journal):
+        return hashlib.sha1((snapshot or b"") + b"\0" + (journal or b"")).hexdigest()
+
+    def signature(self, year, month):
+        return self.file_signature(self.snapshot_path(year, month)), self.file_signature(self.journal_path(year, month))
+
+    def file_signature(self, path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    def month_changed(self, year, month):
+        # Whether another instance changed the month since it was loaded here.
+        # The files are hashed only when their stats differ, and not parsed.
+        key = (year, month)
+        if key in self.stale:
+            return True
+        if key not in self.seen:
+            return False
+        signature, digest = self.seen[key]
+        with self.locked(exclusive=False):
+            current = self.signature(year, month)
+            if current == signature:
+                return False
+            changed = digest is None or self.digest(*self.read_files(year, month)) != digest
+        if changed:
+            self.stale.add(key)
+        else:
+            self.seen[key] = (current, digest)
+        return changed
+
+    def check_stale(self, year, month):
+        # before writing: files that differ from what was last seen here were
+        # changed by another instance
+        key = (year, month)
+        if key in self.seen and self.signature(year, month) != self.seen[key][0]:
+            self.stale.add(key)
+
+    def days_between(self, start, end, project=None):
+        # (date, seconds, notes) of the stored days from start to end inclusive,
+        # for all projects together or for a single one
+        for year, month in months_between(start, end):
+            data = self.months.get((year, month))
+            if data is None:
+                data = self.read_month(year, month)
+            for date in sorted(data, key=lambda date: date[:2]):
+                day = datetime.date(year, month, int(date[:2]))
+                if not start <= day <= end:
+                    continue
+                if project is None:
+                    yield day, parse_duration(data[date]["time_worked"]), data[date]["notes"]
+                else:
+                    entry = day_entries(data[date]).get(project)
+                    if entry is not None:
+                        yield day, entry[0], entry[1]
+
+    def save_month(self, year, month, data):
+        if (year, month) not in self.months:
+            self.load_month(year, month)
+        saved = self.months[(year, month)]
+        for date, day in data.items():
+            if saved.get(date) != day:
+                self.record(year, month, date, day)
+        for date in [date for date in saved if date not in data]:
+            self.record(year, month, date, None)
+
+    def write_month(self, year, month, data):
+        # replace the whole month at once, bypassing the journal
+        key = (year, month)
+        with self.locked():
+            self.check_stale(year, month)
+            write_atomic(self.snapshot_path(year, month), data)
+            journal = self.journals.pop(key, None)
+            if journal is not None:
+                journal.close()
+            if os.path.exists(self.journal_path(year, month)):
+                os.remove(self.journal_path(year, month))
+            self.seen[key] = (self.signature(year, month), None)
+        self.first_change.pop(key, None)
+        self.months.pop(key, None)
+
+    def record(self, year, month, date, day):
+        key = (year, month)
+        if key not in self.months:
+            self.load_month(year, month)
+        record = {"date": date, "updated": time.time()}
+        if day is not None:
+            record.update(day)
+        with self.locked():
+            self.check_stale(year, month)
+            journal = self.journals.get(key)
+            if journal is not None and os.fstat(journal.fileno()).st_nlink == 0:
+                journal.close()  # compacted by another instance
+                journal = None
+            if journal is None:
+                journal = open(self.journal_path(year, month), "a")
+                self.journals[key] = journal
+            journal.write(json.dumps(record) + "\n")
+            journal.flush()
+            self.seen[key] = (self.signature(year, month), None)
+        apply_record(self.months[key], record)
+
+        now = self.clock()
+        self.first_change.setdefault(key, now)
+        if now - self.first_change[key] >= self.flush_interval:
+            self.compact(year, month)
+
+    def merge_days(self, year, month, days):
+        # set entries of days, {date: {project: (seconds, notes)}}, keeping the
+        # other projects of those days; what other instances journaled is
+        # merged in the same exclusive lock, so none of it is lost
+        def merge(data):
+            for date, entries in days.items():
+                merged = day_entries(data[date]) if date in data else {}
+                merged.update(entries)
+                data[date] = make_day(merged)
+
+        self.compact(year, month, merge)
+
+    def compact(self, year, month, merge=None):
+        # merge the files on disk, which may have records of other instances
+        key = (year, month)
+        with self.locked():
+            self.check_stale(year, month)
+            data = self.parse_files(*self.read_files(year, month))
+            if merge is not None:
+                merge(data)
+            write_atomic(self.snapshot_path(year, month), data)
+            journal = self.journals.pop(key, None)
+            if journal is not None:
+                journal.close()
+            if os.path.exists(self.journal_path(year, month)):
+                os.remove(self.journal_path(year, month))
+            self.seen[key] = (self.signature(year, month), None)
+        self.months[key] = data
+        self.first_change.pop(key, None)
+
+    def flush(self, year=None, month=None):
+        for key in list(self.first_change):
+            if year is None or key == (year, month):
+                self.compact(*key)
+
+    def close(self):
+        self.flush()
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+from tests.helpers import BACKENDS
+
+# the Qt tests run without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture(params=BACKENDS, ids=lambda backend: backend.__name__)
+def backend(request):
+    # each storage class, for tests that both must pass
+    return request.param
@@ -0,0 +1,77 @@
+import random
+import time
+
+from durations import format_duration
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+from timesheet_store import date_key
+
+# helpers shared by the tests; the fixtures are in conftest.py
+
+BACKENDS = [JsonStorage, SqliteStorage]
+
+
+def day(seconds):
+    return {"time_worked": f"00:00:{seconds:02d}", "notes": ""}
+
+
+class RecordingStorage:
+    # keeps months in memory and remembers the days that were recorded
+    def __init__(self, months=None):
+        self.months = months or {}
+        self.recorded = []
+
+    def load_month(self, year, month):
+        return {date: dict(day) for date, day in self.months.get((year, month), {}).items()}
+
+    def month_changed(self, year, month):
+        return False
+
+    def record(self, year, month, date, day):
+        self.recorded.append((year, month, date))
+        days = self.months.setdefault((year, month), {})
+        if day is None:
+            days.pop(date, None)
+        else:
+            days[date] = day
+
+
+def write_months(directory, first_year, years, seed=0):
+    # month files of the given years with up to 10 hours on each of the first 28 days
+    rng = random.Random(seed)
+    storage = JsonStorage(directory)
+    for year in range(first_year, first_year + years):
+        for month in range(1, 13):
+            data = {
+                date_key(year, month, number): {
+                    "time_worked": format_duration(rng.randrange(10 * 3600)),
+                    "notes": f"worked on feature {rng.randrange(100)}",
+                }
+                for number in range(1, 29)
+            }
+            storage.write_month(year, month, data)
+    storage.close()
+
+
+def run_ticks(qapp, interval, duration, tick):
+    # lateness of every timeout of a QTimer running for duration seconds
+    from PyQt5.QtCore import QEventLoop, Qt, QTimer
+
+    lateness = []
+    expected = [time.perf_counter() + interval]
+
+    def timeout():
+        now = time.perf_counter()
+        lateness.append(max(now - expected[0], 0))
+        expected[0] = now + interval
+        tick(len(lateness))
+
+    timer = QTimer()
+    timer.setTimerType(Qt.PreciseTimer)
+    timer.timeout.connect(timeout)
+    timer.start(int(interval * 1000))
+    loop = QEventLoop()
+    QTimer.singleShot(int(duration * 1000), loop.quit)
+    loop.exec_()
+    timer.stop()
+    return lateness
@@ -0,0 +1,74 @@
+import datetime
+
+import pytest
+
+from aggregate_index import AggregateIndex
+from analytics import Analytics, format_balance, summary_lines
+from storage import JsonStorage
+from tests.helpers import write_months
+from timesheet_store import TimesheetStore
+
+HOUR = 3600
+# January 2024 starts on a Monday
+JANUARY = [8 * HOUR, 8 * HOUR, 0, 9 * HOUR, 8 * HOUR, 2 * HOUR, 0, 8 * HOUR]
+
+
+def month_seconds(year, month):
+    return JANUARY if (year, month) == (2024, 1) else []
+
+
+def test_summary():
+    analytics = Analytics(month_seconds, 8, [5, 6], today=lambda: datetime.date(2024, 1, 8))
+    summary = analytics.summary(datetime.date(2024, 1, 1), datetime.date(2024, 1, 31))
+    assert summary["last"] == datetime.date(2024, 1, 8)
+    assert summary["worked"] == 43 * HOUR
+    assert summary["working_days"] == 6
+    assert summary["expected"] == 48 * HOUR
+    assert summary["balance"] == -5 * HOUR
+    assert summary["average"] == 43 * HOUR / 6
+    assert summary["last_7_days"] == pytest.approx(35 * HOUR / 7)
+    # the weekend, worked or not, neither extends nor breaks a streak
+    assert (summary["streak"], summary["longest_streak"]) == (3, 3)
+    assert (summary["target_streak"], summary["longest_target_streak"]) == (3, 3)
+    assert summary_lines(summary, 8)[1] == "Overtime balance -05:00:00"
+
+
+def test_days_after_today_are_left_out():
+    analytics = Analytics(month_seconds, 8, [5, 6], today=lambda: datetime.date(2024, 1, 2))
+    summary = analytics.summary(datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+    assert (summary["worked"], summary["expected"]) == (16 * HOUR, 16 * HOUR)
+    assert format_balance(summary["balance"]) == "+00:00:00"
+    assert format_balance(-90) == "-00:01:30"
+
+
+def test_settings_change_the_figures():
+    analytics = Analytics(month_seconds, 8, [5, 6], today=lambda: datetime.date(2024, 1, 8))
+    first, last = datetime.date(2024, 1, 1), datetime.date(2024, 1, 8)
+    analytics.summary(first, last)
+    analytics.set_settings(9, [4, 5, 6])
+    summary = analytics.summary(first, last)
+    assert summary["expected"] == 5 * 9 * HOUR
+    assert summary["longest_target_streak"] == 1
+
+
+def test_summary_over_history_matches_storage(tmp_path):
+    write_months(str(tmp_path), 2015, 2)
+    storage = JsonStorage(str(tmp_path))
+    index = AggregateIndex(storage)
+    first, last = datetime.date(2015, 1, 1), datetime.date(2016, 12, 31)
+    analytics = Analytics(index.month_seconds, 8, [5, 6], today=lambda: last)
+    summary = analytics.summary(first, last)
+    expected = sum(seconds for date, seconds, notes in storage.days_between(first, last))
+    assert summary["worked"] == expected
+    weekdays = sum((first + datetime.timedelta(days=offset)).weekday() < 5 for offset in range((last - first).days + 1))
+    assert summary["expected"] == weekdays * 8 * HOUR
+
+    # a saved month only drops that month from the cache
+    store = TimesheetStore(storage)
+    store.save_listeners += [index.update_month, analytics.month_saved]
+    before = store.sheet(2016, 6).seconds[0]
+    store.set_seconds(2016, 6, 0, HOUR)
+    store.save()
+    assert len(analytics.months) == 23
+    assert analytics.summary(first, last)["worked"] == expected + HOUR - before
+    storage.close()
@@ -0,0 +1,128 @@
+import json
+import time
+
+import pytest
+from PyQt5.QtWidgets import QMessageBox
+
+from instrumentation import Instrumentation
+from storage import JsonStorage
+from tests.helpers import run_ticks
+
+
+@pytest.fixture
+def window(qapp, monkeypatch, tmp_path):
+    # a window on the data in tmp_path with a fake timer clock
+    from app import MainWindow
+
+    monkeypatch.chdir(tmp_path)
+    window = MainWindow()
+    window.show()
+    window.clock = [0.0]
+    window.timer_engine.clock = lambda: window.clock[0]
+    yield window
+    window.close()
+
+
+@pytest.mark.parametrize("enabled", [False, True], ids=["off", "on"])
+def test_profiling(qapp, monkeypatch, tmp_path, enabled):
+    from app import MainWindow
+
+    monkeypatch.chdir(tmp_path)
+    window = MainWindow(Instrumentation(enabled, str(tmp_path / "profile.json")))
+    # when off, nothing is wrapped, so a timer tick costs the same as without it
+    assert ("update_timer" in vars(window)) == enabled
+    assert ("set_seconds" in vars(window.store)) == enabled
+    window.timer_engine.clock = lambda: 10.0
+    window.timer_engine.start()
+    window.timer_engine.clock = lambda: 12.0
+    window.update_timer()
+    window.close()
+    assert (tmp_path / "profile.json").exists() == enabled
+    if enabled:
+        with open(tmp_path / "profile.json") as f:
+            assert json.load(f)["histograms"]["update_timer"]["count"] == 1
+
+
+@pytest.fixture
+def slow_disk(monkeypatch):
+    # every write takes 0.3 s
+    record = JsonStorage.record
+
+    def slow_record(self, year, month, date, day):
+        time.sleep(0.3)
+        record(self, year, month, date, day)
+
+    monkeypatch.setattr(JsonStorage, "record", slow_record)
+
+
+def test_window_keeps_ticking_while_reloading_on_a_slow_disk(qapp, slow_disk, window, tmp_path):
+    window.timer_engine.start()
+
+    def tick(number):
+        # a second of the timer every tick, and settings saved by another instance
+        window.clock[0] += 1.0
+        window.update_timer()
+        if number == 5:
+            JsonStorage(str(tmp_path)).save_settings({"max_hours": 6})
+
+    lateness = run_ticks(qapp, 0.05, 2.0, tick)
+    assert len(lateness) >= 20
+    assert max(lateness) < 0.15
+
+    window.writer.flush()
+    window.reload_changes()
+    assert window.max_hours == 6
+    window.close()
+    with open(tmp_path / "settings.json") as f:
+        assert json.load(f)["max_hours"] == 6
+
+
+@pytest.mark.parametrize(
+    "answer, elapsed", [(QMessageBox.Yes, 1 + 1800 + 600 + 1), (QMessageBox.No, 1 + 1)], ids=["kept", "discarded"]
+)
+def test_gap_is_asked_about_once(window, monkeypatch, answer, elapsed):
+    questions = []
+
+    def question(*args):
+        questions.append(args)
+        window.clock[0] += 600  # until the question is answered
+        return answer
+
+    monkeypatch.setattr(QMessageBox, "question", question)
+    window.set_timer()
+    window.clock[0] += 1
+    window.update_timer()
+    window.clock[0] += 1800
+    window.update_timer()
+    window.clock[0] += 1
+    window.update_timer()
+    assert len(questions) == 1
+    assert window.timer_engine.elapsed() == elapsed
+
+
+def test_summary_reads_the_stored_months_once(window, monkeypatch, tmp_path):
+    window.toggle_summary()
+    reads = []
+    stored_months = window.writer.stored_months
+
+    def count_reads():
+        reads.append(None)
+        return stored_months()
+
+    monkeypatch.setattr(window.writer, "stored_months", count_reads)
+    window.timer_engine.start()
+    for _ in range(5):
+        window.clock[0] += 1.0
+        window.update_timer()
+        window.update_summary()
+    assert reads == []
+
+    # a month saved for the first time is added, one saved by another instance
+    # is read after the watcher reports the directory changed
+    window.store.set_seconds(2001, 1, 0, 60)
+    window.store.save()
+    assert (2001, 1) in window.known_months()
+    JsonStorage(str(tmp_path)).write_month(2000, 1, {"01/01/2000": {"time_worked": "00:01:00", "notes": ""}})
+    window.schedule_reload(str(tmp_path))
+    assert window.known_months()[:2] == [(2000, 1), (2001, 1)]
+    assert len(reads) == 1
@@ -0,0 +1,102 @@
+import time
+
+from PyQt5.QtCore import Qt
+
+from background_writer import BackgroundWriter
+from storage import JsonStorage
+from tests.helpers import day, run_ticks
+from timesheet_store import TimesheetStore
+
+
+class SlowStorage(JsonStorage):
+    # a disk that takes delay seconds for every write
+    def __init__(self, directory, delay):
+        super().__init__(directory)
+        self.delay = delay
+
+    def record(self, year, month, date, day):
+        time.sleep(self.delay)
+        super().record(year, month, date, day)
+
+
+class FailingStorage(JsonStorage):
+    def __init__(self, directory):
+        super().__init__(directory)
+        self.failing = True
+
+    def record(self, year, month, date, day):
+        if self.failing:
+            raise OSError("disk full")
+        super().record(year, month, date, day)
+
+
+def test_timer_keeps_ticking_on_a_slow_disk(qapp, tmp_path):
+    writer = BackgroundWriter(SlowStorage(str(tmp_path), delay=0.3))
+    store = TimesheetStore(writer)
+
+    def tick(number):
+        store.set_seconds(2024, 1, 0, number)
+        store.save()
+
+    lateness = run_ticks(qapp, 0.05, 1.5, tick)
+    ticks = len(lateness)
+    writer.close()
+    assert ticks >= 20
+    assert max(lateness) < 0.1
+    assert JsonStorage(str(tmp_path)).read_month(2024, 1)["01/01/2024"]["time_worked"] == f"00:00:{ticks:02d}"
+
+
+def test_failed_days_are_kept_and_written_later(qapp, tmp_path):
+    storage = FailingStorage(str(tmp_path))
+    writer = BackgroundWriter(storage)
+    messages = []
+    writer.write_failed.connect(messages.append, Qt.DirectConnection)
+    writer.record(2024, 1, "01/01/2024", day(1))
+    writer.record(2024, 1, "02/01/2024", day(2))
+    writer.wait_idle()
+    assert messages == ["Could not save 2024-1: disk full"]
+    # reads still see the failed days
+    assert sorted(writer.read_month(2024, 1)) == ["01/01/2024", "02/01/2024"]
+
+    storage.failing = False
+    writer.flush()
+    writer.close()
+    assert JsonStorage(str(tmp_path)).read_month(2024, 1) == {"01/01/2024": day(1), "02/01/2024": day(2)}
+
+
+def test_newer_days_win_over_failed_ones(qapp, tmp_path):
+    storage = FailingStorage(str(tmp_path))
+    writer = BackgroundWriter(storage)
+    writer.record(2024, 1, "01/01/2024", day(1))
+    writer.wait_idle()
+    storage.failing = False
+    writer.record(2024, 1, "01/01/2024", day(5))
+    writer.record(2024, 1, "01/01/2024", None)
+    writer.close()
+    assert JsonStorage(str(tmp_path)).read_month(2024, 1) == {}
+
+
+def test_close_reports_days_that_could_not_be_saved(qapp, tmp_path):
+    writer = BackgroundWriter(FailingStorage(str(tmp_path)))
+    messages = []
+    writer.write_failed.connect(messages.append, Qt.DirectConnection)
+    writer.record(2024, 1, "01/01/2024", day(1))
+    writer.close()
+    assert messages[-1] == "1 changed days could not be saved"
+
+
+def test_days_being_written_are_read(qapp, tmp_path):
+    # the thread took the day from the queue but waits for the lock that the
+    # window holds while it reloads, see MainWindow.reload_changes
+    writer = BackgroundWriter(JsonStorage(str(tmp_path)))
+    with writer.try_lock() as locked:
+        assert locked
+        writer.record(2024, 1, "01/01/2024", day(1))
+        deadline = time.monotonic() + 5
+        while not writer.busy and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert writer.busy and not writer.pending
+        assert writer.load_month(2024, 1) == {"01/01/2024": day(1)}
+        assert writer.read_month(2024, 1) == {"01/01/2024": day(1)}
+    writer.close()
+    assert JsonStorage(str(tmp_path)).read_month(2024, 1) == {"01/01/2024": day(1)}
@@ -0,0 +1,48 @@
+import ast
+
+import pytest
+
+import benchmark
+
+
+@pytest.fixture(autouse=True)
+def results(monkeypatch):
+    monkeypatch.setattr(benchmark, "RESULTS", {})
+
+
+def baseline(**results):
+    return {"results": {name: {"value": value, "unit": unit} for name, (value, unit) in results.items()}}
+
+
+def test_only_times_and_sizes_are_recorded():
+    benchmark.record("tick", 5.0, "us")
+    with pytest.raises(ValueError):
+        benchmark.record("timer.elapsed", 28800, "s")
+    assert list(benchmark.RESULTS) == ["tick"]
+
+
+def test_every_benchmark_records_a_known_unit():
+    with open(benchmark.__file__) as f:
+        tree = ast.parse(f.read())
+    units = [
+        node.args[2].value
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "record"
+    ]
+    assert len(units) > 40
+    assert set(units) <= set(benchmark.UNITS)
+
+
+def test_compare_flags_results_that_got_higher():
+    benchmark.record("faster", 5.0, "ms")
+    benchmark.record("slower", 13.0, "ms")
+    benchmark.record("within_threshold", 11.0, "ms")
+    benchmark.record("new", 1.0, "ms")
+    old = baseline(faster=(10.0, "ms"), slower=(10.0, "ms"), within_threshold=(10.0, "ms"))
+    assert benchmark.compare(old, 0.2) == ["slower"]
+
+
+def test_compare_skips_results_in_another_unit():
+    benchmark.record("tick", 500.0, "us")
+    benchmark.record("unmeasured", 1.0, "ms")
+    assert benchmark.compare(baseline(tick=(1.0, "ms"), unmeasured=(0, "ms")), 0.2) == []
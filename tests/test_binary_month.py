@@ -0,0 +1,95 @@
+import os
+
+import pytest
+
+from aggregate_index import AggregateIndex
+from binary_month import BinaryMonth, binary_path, convert, encode_month, write_binary_month
+from storage import JsonStorage, make_day
+
+MONTH = {
+    "01/02/2024": {"time_worked": "02:00:00", "notes": "legacy"},
+    "02/02/2024": make_day({"Default": (3600, "default"), "Client X": (1800, "client, ü")}),
+    "29/02/2024": make_day({"Client X": (60, "")}),
+}
+
+
+def age(path, seconds):
+    # move the mtime back, file systems may keep it to the second
+    mtime = os.path.getmtime(path) - seconds
+    os.utime(path, (mtime, mtime))
+
+
+@pytest.fixture
+def directory(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    storage.write_month(2024, 2, MONTH)
+    storage.close()
+    return str(tmp_path)
+
+
+def test_round_trip(directory):
+    path = binary_path(directory, 2024, 2)
+    write_binary_month(path, 2024, 2, MONTH)
+    with BinaryMonth(path) as binary:
+        assert (binary.year, binary.month, binary.days) == (2024, 2, 29)
+        assert binary.projects == ["Client X", "Default"]
+        assert binary.sum_days() == 7200 + 5400 + 60
+        assert list(binary.project_seconds("Client X"))[:3] == [-1, 1800, -1]
+        assert binary.note("Client X", 1) == "client, ü"
+        assert binary.to_json() == MONTH
+
+
+def test_bad_files_are_refused(tmp_path):
+    path = str(tmp_path / "2024-2.hmonth")
+    with open(path, "wb") as f:
+        f.write(b"JUNK" + encode_month(2024, 2, MONTH)[4:])
+    with pytest.raises(ValueError):
+        BinaryMonth(path)
+    with open(path, "wb") as f:
+        f.write(encode_month(2024, 2, MONTH)[:40])
+    with pytest.raises(ValueError):
+        BinaryMonth(path)
+
+
+def test_convert_both_ways(directory):
+    assert convert(directory) == ([(2024, 2)], [])
+    os.remove(os.path.join(directory, "2024-2.json"))
+    assert convert(directory, to_json=True) == ([(2024, 2)], [])
+    assert JsonStorage(directory).read_month(2024, 2) == MONTH
+
+
+def test_convert_skips_months_changed_since(directory):
+    convert(directory)
+    age(binary_path(directory, 2024, 2), 10)
+    storage = JsonStorage(directory)
+    storage.record(2024, 2, "03/02/2024", {"time_worked": "01:00:00", "notes": "newer"})
+    storage.close()
+    assert convert(directory, to_json=True) == ([], [(2024, 2)])
+    assert JsonStorage(directory).read_month(2024, 2)["03/02/2024"]["notes"] == "newer"
+
+
+def test_index_reads_up_to_date_binary_months(directory, monkeypatch):
+    convert(directory)
+    age(os.path.join(directory, "2024-2.json"), 10)
+    storage = JsonStorage(directory)
+    expected = AggregateIndex(storage)
+    expected.refresh()
+
+    def read_month(year, month):
+        raise AssertionError("read the JSON files")
+
+    monkeypatch.setattr(storage, "read_month", read_month)
+    index = AggregateIndex(storage, "binary-index.json")
+    index.refresh()
+    assert index.months[(2024, 2)][1:] == expected.months[(2024, 2)][1:]
+    assert index.project_totals == {"Default": 10800, "Client X": 1860}
+
+
+def test_index_ignores_out_of_date_binary_months(directory):
+    convert(directory)
+    age(binary_path(directory, 2024, 2), 10)
+    storage = JsonStorage(directory)
+    storage.write_month(2024, 2, {"01/02/2024": {"time_worked": "00:01:00", "notes": ""}})
+    index = AggregateIndex(storage)
+    index.refresh()
+    assert index.project_totals == {"Default": 60}
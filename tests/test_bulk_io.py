@@ -0,0 +1,125 @@
+import datetime
+import io
+import json
+
+import pytest
+
+import bulk_io
+from storage import JsonStorage, iter_entries
+
+
+def ndjson(*records):
+    text = "".join(json.dumps(record) + "\n" for record in records)
+    return lambda: bulk_io.read_ndjson(io.StringIO(text))
+
+
+def entries(storage):
+    return list(iter_entries(storage, datetime.date(2024, 1, 1), datetime.date(2024, 12, 31)))
+
+
+def test_import_merges_with_stored_projects(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    storage.record(2024, 1, "05/01/2024", {"time_worked": "01:00:00", "notes": "kept"})
+    count = bulk_io.import_records(
+        storage,
+        ndjson(
+            {"date": "2024-01-05", "project": "Client X", "time_worked": "2h"},
+            {"date": "06/01/2024", "seconds": 60, "notes": "imported"},
+            {"date": "2024-02-01", "time_worked": "00:30:00"},
+        ),
+    )
+    assert count == 3
+    assert sorted(entries(storage)) == [
+        (datetime.date(2024, 1, 5), "Client X", 7200, ""),
+        (datetime.date(2024, 1, 5), "Default", 3600, "kept"),
+        (datetime.date(2024, 1, 6), "Default", 60, "imported"),
+        (datetime.date(2024, 2, 1), "Default", 1800, ""),
+    ]
+    storage.close()
+
+
+def test_import_keeps_days_journaled_by_another_instance(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    storage.record(2024, 1, "01/01/2024", {"time_worked": "01:00:00", "notes": "mine"})
+    storage.load_month(2024, 1)
+    # journaled after this instance read the month, not compacted yet
+    other = JsonStorage(str(tmp_path))
+    other.record(2024, 1, "03/01/2024", {"time_worked": "03:00:00", "notes": "other"})
+
+    bulk_io.import_records(storage, ndjson({"date": "2024-01-02", "time_worked": "2h"}))
+    assert sorted(JsonStorage(str(tmp_path)).read_month(2024, 1)) == ["01/01/2024", "02/01/2024", "03/01/2024"]
+
+    # the other instance keeps journaling into the compacted month
+    other.record(2024, 1, "04/01/2024", {"time_worked": "04:00:00", "notes": "later"})
+    other.close()
+    storage.close()
+    assert sorted(JsonStorage(str(tmp_path)).read_month(2024, 1)) == [
+        "01/01/2024",
+        "02/01/2024",
+        "03/01/2024",
+        "04/01/2024",
+    ]
+
+
+def test_bad_record_imports_nothing(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    storage.record(2024, 1, "05/01/2024", {"time_worked": "01:00:00", "notes": ""})
+    rows = ndjson(
+        {"date": "2024-01-05", "time_worked": "8h"},
+        {"date": "2024-02-01", "time_worked": "2h"},
+        {"date": "2024-03-01", "time_worked": "soon"},
+    )
+    with pytest.raises(ValueError, match="line 3: bad duration"):
+        bulk_io.import_records(storage, rows)
+    assert entries(storage) == [(datetime.date(2024, 1, 5), "Default", 3600, "")]
+    assert storage.stored_months() == [(2024, 1)]
+    storage.close()
+
+
+def test_validate_reports_every_bad_line():
+    count, errors = bulk_io.validate(
+        bulk_io.read_csv(io.StringIO("date,project,time_worked\n2024-01-01,,2h\n2024-13-01,,2h\n2024-01-02,,x\n"))
+    )
+    assert count == 1
+    assert [line_number for line_number, error in errors] == [3, 4]
+
+
+def test_durations_over_24_hours():
+    # a typed duration is capped like in the table, a number of seconds can't be
+    parsed = list(
+        bulk_io.parse_records(
+            ndjson(
+                {"date": "2024-01-05", "seconds": 500000},
+                {"date": "2024-01-06", "seconds": 86400},
+                {"date": "2024-01-07", "time_worked": "30:00:00"},
+            )()
+        )
+    )
+    assert parsed[0] == (1, "bad duration 500000, more than 24 hours")
+    assert parsed[1][3] == parsed[2][3] == 86400
+
+
+def test_export_and_import_round_trip(tmp_path):
+    source = JsonStorage(str(tmp_path / "source"))
+    (tmp_path / "source").mkdir()
+    (tmp_path / "target").mkdir()
+    source.record(2024, 1, "05/01/2024", {"time_worked": "01:00:00", "notes": "a, \"quoted\" note"})
+    source.record(
+        2024,
+        3,
+        "06/03/2024",
+        {
+            "time_worked": "03:00:00",
+            "notes": "",
+            "projects": {
+                "Default": {"time_worked": "01:00:00", "notes": ""},
+                "Client X": {"time_worked": "02:00:00", "notes": "x"},
+            },
+        },
+    )
+    for file_format, read in (("csv", bulk_io.read_csv), ("ndjson", bulk_io.read_ndjson)):
+        output = io.StringIO()
+        bulk_io.export_entries(source, output, file_format, datetime.date(2024, 1, 1), datetime.date(2024, 12, 31))
+        target = JsonStorage(str(tmp_path / "target"))
+        bulk_io.import_records(target, lambda: read(io.StringIO(output.getvalue())))
+        assert entries(target) == entries(source)
@@ -0,0 +1,77 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(directory, *args):
+    cli.main(["--directory", str(directory), *args])
+
+
+def test_cli_does_not_import_gui_modules():
+    code = (
+        "import sys, cli; "
+        "print(' '.join(name for name in sys.modules if name.split('.')[0] in ('PyQt5', 'matplotlib', 'seaborn', 'numpy')))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], env=dict(os.environ, PYTHONPATH=HERE), capture_output=True, text=True, check=True
+    )
+    assert output.stdout.split() == []
+
+
+def test_log_and_report(tmp_path, capsys):
+    run(tmp_path, "log", "2h", "--date", "2024-01-31", "--note", "review")
+    run(tmp_path, "log", "45m", "--date", "2024-01-31")
+    run(tmp_path, "log", "30m", "--date", "2024-01-30", "--project", "Client X")
+    capsys.readouterr()
+
+    run(tmp_path, "report", "--month", "2024-01")
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == ["30/01/2024   00:30:00  ", "31/01/2024   02:45:00  review", "Total        03:15:00"]
+
+    run(tmp_path, "report", "--week", "2024-W05", "--project", "Client X")
+    assert capsys.readouterr().out.splitlines()[-1] == "Total        00:30:00"
+
+
+def test_log_caps_the_day_at_24_hours(tmp_path, capsys):
+    run(tmp_path, "log", "20h", "--date", "2024-01-31")
+    run(tmp_path, "log", "20h", "--date", "2024-01-31")
+    assert capsys.readouterr().out.splitlines()[-1] == "2024-01-31 Default: 24:00:00"
+
+
+def test_start_and_stop(tmp_path, capsys):
+    run(tmp_path, "start", "--project", "Client X")
+    with pytest.raises(SystemExit):
+        run(tmp_path, "start")
+    run(tmp_path, "stop")
+    assert "for Client X" in capsys.readouterr().out
+    assert not os.path.exists(tmp_path / cli.TIMER_STATE)
+    with pytest.raises(SystemExit):
+        run(tmp_path, "stop")
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["report", "--month", "2026-13"],
+        ["report", "--month", "January"],
+        ["report", "--week", "2024-W99"],
+        ["summary", "--week", "2024-05"],
+        ["log", "2h", "--date", "31/01/2024"],
+    ],
+)
+def test_malformed_arguments_are_usage_errors(tmp_path, capsys, args):
+    with pytest.raises(SystemExit) as exit:
+        run(tmp_path, *args)
+    assert exit.value.code == 2
+    assert "usage:" in capsys.readouterr().err
+
+
+def test_bad_duration(tmp_path):
+    with pytest.raises(SystemExit, match="Can't understand duration"):
+        run(tmp_path, "log", "soon")
@@ -0,0 +1,52 @@
+import datetime
+
+import pytest
+
+
+@pytest.fixture
+def graph(qapp):
+    from graph import HoursGraph
+
+    return HoursGraph()
+
+
+def year_days(year, hours):
+    first = datetime.date(year, 1, 1)
+    days = (datetime.date(year + 1, 1, 1) - first).days
+    return [(first + datetime.timedelta(days=index), hours * 3600) for index in range(days)]
+
+
+def test_plot_of_the_same_month_length_reuses_the_bars(graph):
+    graph.plot([1.0] * 31)
+    bars = graph.bars
+    assert len(bars) == 31
+    graph.plot([float(day) for day in range(31)])
+    assert graph.bars is bars
+    assert [bar.get_height() for bar in graph.bars] == [float(day) for day in range(31)]
+    assert list(graph.axes.patches) == bars
+
+    graph.plot([2.0] * 30)
+    assert graph.bars is not bars
+    assert len(graph.bars) == len(graph.axes.patches) == 30
+
+
+def test_plot_year_updates_the_heatmap_in_place(graph):
+    graph.plot_year(2023, year_days(2023, 1))
+    image = graph.image
+    graph.plot_year(2022, year_days(2022, 4))
+    assert graph.image is image
+    assert image.get_clim() == (0, 4)
+    assert graph.axes.get_title() == "Hours Worked in 2022"
+
+
+def test_switching_modes_resets_the_other_one(graph):
+    graph.plot([1.0] * 31)
+    graph.plot_year(2023, year_days(2023, 1))
+    assert graph.bars is None
+    assert graph.image is not None
+    assert len(graph.axes.patches) == 0
+
+    graph.plot([1.0] * 31)
+    assert graph.image is None
+    assert len(graph.bars) == 31
+    assert len(graph.axes.images) == 0
@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import instrumentation
+from instrumentation import ENVIRONMENT_VARIABLE, Histogram, Instrumentation
+
+
+class Target:
+    def __init__(self):
+        self.calls = []
+
+    def slot(self):
+        self.calls.append(())
+
+    def slot_with_row(self, row, column=0):
+        self.calls.append((row, column))
+
+    def varargs(self, *args):
+        self.calls.append(args)
+
+
+def test_disabled_wrap_leaves_the_object_alone():
+    target = Target()
+    profile = Instrumentation()
+    profile.wrap(target, ["slot"])
+    profile.count_bytes(target, ["slot_with_row"])
+    assert vars(target) == {"calls": []}
+    assert profile.stats() == {}
+
+
+def test_wrap_times_calls_and_drops_extra_signal_arguments():
+    target = Target()
+    profile = Instrumentation(True)
+    profile.wrap(target, ["slot", "slot_with_row", "varargs"])
+    # e.g. clicked(bool) connected to a slot without arguments
+    target.slot(True)
+    target.slot_with_row(3, 2, "extra")
+    target.varargs(1, 2, 3)
+    assert target.calls == [(), (3, 2), (1, 2, 3)]
+    stats = profile.stats()
+    assert list(stats) == ["slot", "slot_with_row", "varargs"]
+    assert all(histogram["count"] == 1 for histogram in stats.values())
+    assert target.slot.__name__ == "slot"
+
+
+def test_count_bytes(monkeypatch):
+    # the first call checks that the counter is available
+    written = iter([0, 100, 350])
+    monkeypatch.setattr(instrumentation, "bytes_written", lambda: next(written, 0))
+    target = Target()
+    profile = Instrumentation(True)
+    profile.count_bytes(target, ["slot"])
+    target.slot()
+    assert profile.histogram("bytes written").to_dict()["max"] == 250
+
+
+@pytest.mark.parametrize(
+    "environment, argv, enabled, path",
+    [
+        (None, ["app.py"], False, None),
+        ("0", ["app.py"], False, None),
+        ("1", ["app.py"], True, "profile.json"),
+        ("run.json", ["app.py"], True, "run.json"),
+        (None, ["app.py", "--profile"], True, "profile.json"),
+        ("0", ["app.py", "--profile=out.json", "-x"], True, "out.json"),
+    ],
+)
+def test_from_arguments(monkeypatch, environment, argv, enabled, path):
+    if environment is None:
+        monkeypatch.delenv(ENVIRONMENT_VARIABLE, raising=False)
+    else:
+        monkeypatch.setenv(ENVIRONMENT_VARIABLE, environment)
+    profile = Instrumentation.from_arguments(argv)
+    assert profile.enabled == enabled
+    assert not any(argument.startswith("--profile") for argument in argv)
+    if enabled:
+        assert profile.dump_path == path
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.to_dict() == {"count": 0, "mean": 0, "p50": 0, "p90": 0, "p99": 0, "max": 0}
+    for value in range(1, 101):
+        histogram.add(value)
+    stats = histogram.to_dict()
+    assert stats["count"] == 100
+    assert stats["mean"] == 50.5
+    assert stats["max"] == 100
+    # within a factor of two of the exact percentiles, and never above the max
+    assert 50 <= stats["p50"] < 100
+    assert 90 <= stats["p90"] <= 100
+    assert stats["p99"] == 100
+
+
+def test_dump(tmp_path):
+    path = tmp_path / "profile.json"
+    Instrumentation(False, str(path)).dump()
+    assert not path.exists()
+    profile = Instrumentation(True, str(path))
+    profile.histogram("tick").add(10)
+    profile.dump()
+    with open(path) as f:
+        dumped = json.load(f)
+    assert dumped["histograms"] == {"tick": {"count": 1, "mean": 10, "p50": 10, "p90": 10, "p99": 10, "max": 10}}
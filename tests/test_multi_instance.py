@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from aggregate_index import AggregateIndex
+from sqlite_storage import SqliteStorage
+from storage import JsonStorage
+from tests.helpers import day
+from timesheet_store import MonthSheet, TimesheetStore
+
+
+def test_latest_change_of_each_day_wins(tmp_path):
+    # two stores editing the same month, compacting after every second change
+    ticks = iter(range(10 ** 6))
+    storages = [JsonStorage(str(tmp_path), flush_interval=2, clock=lambda: next(ticks)) for _ in range(2)]
+    stores = [TimesheetStore(storage) for storage in storages]
+    expected = {}
+    for index in range(28):
+        for number, store in enumerate(stores):
+            if index % (number + 2) == 0:
+                store.set_seconds(2024, 2, index, 60 * index + number)
+                store.save()
+                expected[index] = 60 * index + number
+    assert [store.refresh(2024, 2) for store in stores] == [True, True]
+    for storage in storages:
+        storage.close()
+
+    merged = TimesheetStore(JsonStorage(str(tmp_path))).sheet(2024, 2)
+    for store in stores:
+        assert list(store.sheet(2024, 2).seconds) == list(merged.seconds)
+    assert {index: merged.seconds[index] for index in expected} == expected
+    assert sum(merged.seconds) == sum(expected.values())
+
+
+def test_own_changes_are_not_reported(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    storage.load_month(2024, 1)
+    storage.record(2024, 1, "01/01/2024", day(1))
+    storage.flush()
+    assert not storage.month_changed(2024, 1)
+    storage.save_settings({"max_hours": 6})
+    assert not storage.settings_changed()
+    storage.close()
+
+
+def test_changes_of_another_instance_are_reported(tmp_path, backend):
+    first, second = backend(str(tmp_path)), backend(str(tmp_path))
+    first.load_month(2024, 1)
+    first.load_settings()
+    second.record(2024, 1, "01/01/2024", day(1))
+    second.save_settings({"max_hours": 6})
+    assert first.month_changed(2024, 1)
+    assert first.settings_changed()
+    assert first.load_settings() == {"max_hours": 6}
+    assert not first.settings_changed()
+    first.close()
+    second.close()
+
+
+def test_settings_saved_unchanged_are_not_reported(tmp_path):
+    first, second = JsonStorage(str(tmp_path)), JsonStorage(str(tmp_path))
+    first.save_settings({"max_hours": 6})
+    second.save_settings(second.load_settings())
+    assert not first.settings_changed()
+
+
+def test_sqlite_instances_take_turns_writing(tmp_path):
+    # neither instance keeps a transaction open between changes, so the
+    # other one never waits for it
+    path = str(tmp_path)
+    SqliteStorage(path).close()
+    storages = [SqliteStorage(path, busy_timeout=0.1) for _ in range(2)]
+    for storage in storages:
+        storage.load_month(2024, 1)
+    for number in range(1, 21):
+        storages[number % 2].record(2024, 1, f"{number:02d}/01/2024", day(number))
+    storages[0].save_settings({"max_hours": 6})
+    storages[1].save_settings({"max_hours": 7})
+    for storage in storages:
+        assert storage.month_changed(2024, 1)
+        assert len(storage.load_month(2024, 1)) == 20
+    assert storages[0].load_settings() == {"max_hours": 7}
+    for storage in storages:
+        storage.close()
+
+
+def test_sqlite_batch_is_one_transaction(tmp_path):
+    storage = SqliteStorage(str(tmp_path))
+    with pytest.raises(OSError):
+        with storage.batch():
+            storage.record(2024, 1, "01/01/2024", day(1))
+            raise OSError("disk full")
+    assert storage.read_month(2024, 1) == {}
+    with storage.batch():
+        storage.record(2024, 1, "01/01/2024", day(1))
+        storage.record(2024, 1, "02/01/2024", day(2))
+    # committed, another connection sees it
+    connection = sqlite3.connect(os.path.join(str(tmp_path), "timesheet.db"))
+    assert connection.execute("SELECT COUNT(*) FROM entries").fetchone() == (2,)
+    connection.close()
+    storage.close()
+
+
+def test_indexes_saved_at_once_by_two_instances(tmp_path):
+    # e.g. two windows closing together; each write_atomic has a temp file of its own
+    errors = []
+
+    def save_repeatedly(index):
+        try:
+            for _ in range(200):
+                index.dirty = True
+                index.save()
+        except OSError as error:
+            errors.append(error)
+
+    indexes = []
+    for _ in range(2):
+        index = AggregateIndex(JsonStorage(str(tmp_path)))
+        index.update_month(MonthSheet(2024, 1))
+        indexes.append(index)
+    threads = [threading.Thread(target=save_repeatedly, args=(index,)) for index in indexes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert os.listdir(str(tmp_path)) == ["hours-index.json"]
+    reopened = AggregateIndex(JsonStorage(str(tmp_path)))
+    reopened.load()
+    assert list(reopened.months) == [(2024, 1)]
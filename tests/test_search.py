@@ -0,0 +1,172 @@
+import datetime
+import os
+
+import pytest
+
+from search import NotesIndex
+from storage import JsonStorage
+from timesheet_store import MonthSheet
+
+
+def entry(notes, hours=1):
+    return {"time_worked": f"{hours:02d}:00:00", "notes": notes}
+
+
+MONTHS = {
+    (2024, 1): {
+        "02/01/2024": entry("reviewed the client contract"),
+        "03/01/2024": entry("client call, planning"),
+        "04/01/2024": {
+            "time_worked": "03:00:00",
+            "notes": "",
+            "projects": {"Default": entry("", 1), "Website": entry("review of the landing page", 2)},
+        },
+    },
+    (2024, 2): {"01/02/2024": entry("Client review!")},
+}
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    for (year, month), data in MONTHS.items():
+        storage.write_month(year, month, data)
+    yield storage
+    storage.close()
+
+
+def dates(results):
+    return [(date, project) for date, project, notes in results]
+
+
+def test_prefix_and_multi_word_queries(storage):
+    index = NotesIndex(storage)
+    assert dates(index.search("rev")) == [
+        (datetime.date(2024, 1, 2), "Default"),
+        (datetime.date(2024, 1, 4), "Website"),
+        (datetime.date(2024, 2, 1), "Default"),
+    ]
+    # every word of the query, in any order and case
+    assert dates(index.search("CLI rev")) == [
+        (datetime.date(2024, 1, 2), "Default"),
+        (datetime.date(2024, 2, 1), "Default"),
+    ]
+    assert index.search("client review")[1] == (datetime.date(2024, 2, 1), "Default", "Client review!")
+    assert index.search("client website") == []
+    assert index.search("reviewing") == []
+
+
+def test_queries_without_words_find_nothing(storage):
+    index = NotesIndex(storage)
+    assert index.search("!?") == []
+    assert index.search("") == []
+    assert dates(index.search("call,")) == [(datetime.date(2024, 1, 3), "Default")]
+
+
+def test_only_the_changed_days_are_reindexed(storage, monkeypatch):
+    index = NotesIndex(storage)
+    index.refresh()
+    sheet = MonthSheet(2024, 1)
+    sheet.load(storage.read_month(2024, 1))
+    sheet.project("Default").notes[2] = "client call, budget"
+    changed = []
+
+    def spy(sign, method):
+        def wrapper(entry, words):
+            changed.append((sign, entry, words))
+            method(entry, words)
+
+        return wrapper
+
+    monkeypatch.setattr(index, "add_words", spy("+", index.add_words))
+    monkeypatch.setattr(index, "remove_words", spy("-", index.remove_words))
+    index.update_month(sheet)
+    assert changed == [
+        ("-", (2024, 1, 2, "Default"), {"planning"}),
+        ("+", (2024, 1, 2, "Default"), {"budget"}),
+    ]
+    assert index.search("plan") == []
+    assert dates(index.search("budg")) == [(datetime.date(2024, 1, 3), "Default")]
+    assert "planning" not in index.postings
+
+    # notes removed from a day take its words with them
+    sheet.project("Default").notes[2] = ""
+    index.update_month(sheet)
+    assert dates(index.search("call")) == []
+    assert "call" not in index.postings
+
+
+def test_index_is_rebuilt_from_its_file(storage, monkeypatch):
+    index = NotesIndex(storage)
+    expected = index.search("client")
+    index.save()
+    assert os.path.exists(index.path)
+
+    def read_month(year, month):
+        raise AssertionError(f"{year}-{month} read again")
+
+    monkeypatch.setattr(storage, "read_month", read_month)
+    reopened = NotesIndex(storage)
+    assert reopened.search("client") == expected
+    assert reopened.postings == index.postings
+
+
+def test_months_newer_than_the_index_are_read_again(storage, monkeypatch):
+    index = NotesIndex(storage)
+    index.refresh()
+    index.save()
+    other = JsonStorage(storage.directory)
+    other.write_month(2024, 2, {"05/02/2024": entry("client workshop")})
+    other.close()
+    later = index.months[(2024, 2)][0] + 10
+    os.utime(os.path.join(storage.directory, "2024-2.json"), (later, later))
+
+    read = []
+    read_month = storage.read_month
+
+    def counted_read_month(year, month):
+        read.append((year, month))
+        return read_month(year, month)
+
+    monkeypatch.setattr(storage, "read_month", counted_read_month)
+    reopened = NotesIndex(storage)
+    assert dates(reopened.search("client")) == [
+        (datetime.date(2024, 1, 2), "Default"),
+        (datetime.date(2024, 1, 3), "Default"),
+        (datetime.date(2024, 2, 5), "Default"),
+    ]
+    assert read == [(2024, 2)]
+
+
+@pytest.fixture
+def dialog(qapp, storage):
+    from search_dialog import SearchDialog
+
+    return SearchDialog(NotesIndex(storage))
+
+
+def test_dialog_shows_the_latest_days_first(dialog, monkeypatch):
+    activated = []
+    dialog.day_activated.connect(lambda date, project: activated.append((date, project)))
+    dialog.query_edit.setText("client")
+    assert dialog.table.rowCount() == 3
+    assert [dialog.table.item(row, 0).text() for row in range(3)] == ["01/02/2024", "03/01/2024", "02/01/2024"]
+    assert dialog.status_label.text().startswith("3 days found")
+    dialog.activate(1)
+    dialog.activate_first()
+    assert activated == [(datetime.date(2024, 1, 3), "Default"), (datetime.date(2024, 2, 1), "Default")]
+
+    monkeypatch.setattr("search_dialog.MAX_RESULTS", 2)
+    dialog.search("client")
+    assert dialog.table.rowCount() == 2
+    assert dialog.status_label.text().endswith("showing the latest 2")
+    dialog.activate_first()
+    assert activated[-1] == (datetime.date(2024, 2, 1), "Default")
+
+    dialog.query_edit.setText("...")
+    assert dialog.table.rowCount() == 0
+    assert dialog.status_label.text().startswith("0 days found")
+    dialog.query_edit.setText("")
+    assert dialog.status_label.text() == ""
+    dialog.activate_first()
+    assert len(activated) == 3
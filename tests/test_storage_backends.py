@@ -0,0 +1,121 @@
+import datetime
+import sqlite3
+
+from sqlite_storage import SqliteStorage
+from storage import make_day
+from tests.helpers import BACKENDS
+
+LEGACY_DAY = {"time_worked": "02:00:00", "notes": "legacy"}
+PROJECTS_DAY = make_day({"Default": (3600, "default"), "Client X": (1800, "client")})
+
+
+def fill(storage):
+    storage.record(2024, 1, "05/01/2024", LEGACY_DAY)
+    storage.record(2024, 1, "06/01/2024", PROJECTS_DAY)
+    storage.record(2024, 2, "01/02/2024", {"time_worked": "00:30:00", "notes": ""})
+
+
+def test_record_and_read_month(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    fill(storage)
+    assert storage.read_month(2024, 1) == {"05/01/2024": LEGACY_DAY, "06/01/2024": PROJECTS_DAY}
+    storage.close()
+
+    storage = backend(str(tmp_path))
+    assert storage.read_month(2024, 1) == {"05/01/2024": LEGACY_DAY, "06/01/2024": PROJECTS_DAY}
+    assert storage.load_month(2024, 2) == {"01/02/2024": {"time_worked": "00:30:00", "notes": ""}}
+    assert storage.read_month(2024, 3) == {}
+    assert storage.stored_months() == [(2024, 1), (2024, 2)]
+    storage.close()
+
+
+def test_record_replaces_and_removes_days(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    fill(storage)
+    storage.record(2024, 1, "05/01/2024", {"time_worked": "04:00:00", "notes": "changed"})
+    storage.record(2024, 1, "06/01/2024", None)
+    storage.close()
+    storage = backend(str(tmp_path))
+    assert storage.read_month(2024, 1) == {"05/01/2024": {"time_worked": "04:00:00", "notes": "changed"}}
+    storage.close()
+
+
+def test_save_month_and_write_month(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    fill(storage)
+    storage.save_month(2024, 1, {"07/01/2024": LEGACY_DAY})
+    assert storage.read_month(2024, 1) == {"07/01/2024": LEGACY_DAY}
+    storage.write_month(2024, 2, {"02/02/2024": PROJECTS_DAY})
+    storage.close()
+    storage = backend(str(tmp_path))
+    assert storage.read_month(2024, 1) == {"07/01/2024": LEGACY_DAY}
+    assert storage.read_month(2024, 2) == {"02/02/2024": PROJECTS_DAY}
+    storage.close()
+
+
+def test_days_between(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    fill(storage)
+    first, last = datetime.date(2024, 1, 6), datetime.date(2024, 2, 29)
+    assert list(storage.days_between(first, last)) == [
+        (datetime.date(2024, 1, 6), 5400, "default"),
+        (datetime.date(2024, 2, 1), 1800, ""),
+    ]
+    assert list(storage.days_between(datetime.date(2024, 1, 1), last, "Client X")) == [
+        (datetime.date(2024, 1, 6), 1800, "client"),
+    ]
+    assert list(storage.days_between(datetime.date(2024, 1, 1), last, "Default")) == [
+        (datetime.date(2024, 1, 5), 7200, "legacy"),
+        (datetime.date(2024, 1, 6), 3600, "default"),
+        (datetime.date(2024, 2, 1), 1800, ""),
+    ]
+    storage.close()
+
+
+def test_settings(tmp_path, backend):
+    storage = backend(str(tmp_path))
+    assert storage.load_settings() == {}
+    settings = {"max_hours": 6, "weekend_days": [5, 6], "projects": ["Default", "Client X"]}
+    storage.save_settings(settings)
+    storage.close()
+    storage = backend(str(tmp_path))
+    assert storage.load_settings() == settings
+    storage.save_settings({"max_hours": 7})
+    assert storage.load_settings() == {"max_hours": 7}
+    storage.close()
+
+
+def test_backends_agree(tmp_path):
+    results = []
+    for backend in BACKENDS:
+        directory = tmp_path / backend.__name__
+        directory.mkdir()
+        storage = backend(str(directory))
+        fill(storage)
+        storage.record(2024, 1, "05/01/2024", None)
+        storage.close()
+        storage = backend(str(directory))
+        end = datetime.date(2024, 12, 31)
+        results.append(
+            (
+                storage.read_month(2024, 1),
+                storage.read_month(2024, 2),
+                list(storage.days_between(datetime.date(2024, 1, 1), end)),
+            )
+        )
+        storage.close()
+    assert results[0] == results[1]
+
+
+def test_sqlite_upgrades_legacy_days_table(tmp_path):
+    connection = sqlite3.connect(str(tmp_path / "timesheet.db"))
+    connection.execute("CREATE TABLE days (date TEXT PRIMARY KEY, seconds INTEGER NOT NULL, notes TEXT NOT NULL)")
+    connection.execute("INSERT INTO days VALUES ('2024-01-05', 7200, 'legacy')")
+    connection.commit()
+    connection.close()
+
+    storage = SqliteStorage(str(tmp_path))
+    assert storage.read_month(2024, 1) == {"05/01/2024": LEGACY_DAY}
+    tables = [row[0] for row in storage.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert "days" not in tables
+    storage.close()
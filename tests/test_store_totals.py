@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from storage import JsonStorage
+from timesheet_store import TimesheetStore
+
+PROJECTS = ["Default", "Client X", "Client Y"]
+MONTHS = [(2023, month) for month in range(10, 13)] + [(2024, month) for month in range(1, 5)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_totals_stay_consistent_through_edits_evictions_and_reloads(tmp_path, seed):
+    rng = random.Random(seed)
+    storage = JsonStorage(str(tmp_path), flush_interval=0)
+    # check_totals recomputes and compares the totals after every change
+    store = TimesheetStore(storage, check_totals=True, cache_size=2)
+    other = JsonStorage(str(tmp_path), flush_interval=0)
+    for step in range(300):
+        year, month = rng.choice(MONTHS)
+        index = rng.randrange(store.sheet(year, month).days)
+        action = rng.random()
+        if action < 0.6:
+            store.set_seconds(year, month, index, rng.choice([0, rng.randrange(1, 10 * 3600)]), rng.choice(PROJECTS))
+        elif action < 0.7:
+            store.set_notes(year, month, index, f"note {step}", rng.choice(PROJECTS))
+        elif action < 0.85:
+            store.save()
+        elif action < 0.95:
+            # another instance changes a day of a month that may be cached
+            day = {"time_worked": "01:00:00", "notes": f"other {step}"}
+            other.record(year, month, f"{index + 1:02d}/{month:02d}/{year}", day)
+            store.refresh(year, month)
+        else:
+            store.save()
+            store.reload(year, month)
+    store.save()
+    store.verify_totals()
+    assert store.evicted
+
+    # the totals agree with a store that loads everything from disk again
+    storage.flush()
+    fresh = TimesheetStore(JsonStorage(str(tmp_path)))
+    for year, month in MONTHS:
+        fresh.sheet(year, month)
+    for year, month in MONTHS:
+        assert store.month_total(year, month) == fresh.month_total(year, month)
+    for project in PROJECTS:
+        assert store.project_total(project) == fresh.project_total(project)
+    assert store.year_total(2024) == fresh.year_total(2024)
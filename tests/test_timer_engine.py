@@ -0,0 +1,131 @@
+import datetime
+import random
+
+from timer_engine import IntervalJournal, TimerEngine
+
+TODAY = datetime.date(2024, 1, 31)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_engine():
+    clock = FakeClock()
+    return TimerEngine(clock=clock, wall_clock=clock), clock
+
+
+def test_elapsed_follows_the_clock_with_late_and_dropped_ticks():
+    engine, clock = make_engine()
+    rng = random.Random(0)
+    engine.start()
+    while clock.now < 1000 + 3600:
+        clock.now += rng.choice([1.0, 1.0, 1.3, 2.0, 5.0])
+        engine.tick()
+    engine.stop()
+    assert engine.elapsed() == int(clock.now - 1000)
+    assert engine.take_intervals() == [(1000.0, engine.elapsed())]
+    assert engine.take_intervals() == []
+
+
+def test_split_and_set_elapsed_end_the_interval():
+    engine, clock = make_engine()
+    engine.start()
+    clock.now += 60
+    engine.split()
+    clock.now += 30
+    engine.set_elapsed(3600)
+    clock.now += 10
+    assert engine.elapsed() == 3610
+    assert engine.take_intervals() == [(1000.0, 60), (1060.0, 30)]
+
+
+def test_tick_reports_the_gap():
+    engine, clock = make_engine()
+    engine.start()
+    clock.now += 1
+    assert engine.tick() == 1
+    clock.now += 1800
+    assert engine.tick() == 1800
+
+
+def test_kept_gap_counts_and_resets_the_tick():
+    engine, clock = make_engine()
+    engine.start()
+    clock.now += 1800
+    engine.tick()
+    clock.now += 600  # while the question is shown
+    engine.keep_gap()
+    clock.now += 1
+    assert engine.tick() == 1
+    assert engine.elapsed() == 2401
+
+
+def test_discarded_gap_does_not_count_and_resets_the_tick():
+    engine, clock = make_engine()
+    engine.start()
+    clock.now += 10
+    engine.tick()
+    clock.now += 1800
+    engine.tick()
+    clock.now += 600
+    engine.discard_gap()
+    clock.now += 1
+    assert engine.tick() == 1
+    assert engine.elapsed() == 11
+    assert engine.take_intervals() == [(1000.0, 10)]
+
+
+def test_journal_replays_a_workday(tmp_path):
+    # late and dropped ticks, two project switches, a suspend that is kept
+    # and one that is discarded
+    engine, clock = make_engine()
+    rng = random.Random(1)
+    journal = IntervalJournal(str(tmp_path))
+    expected = {}
+    project = "Default"
+    engine.start()
+    started = clock.now
+    for number in range(8):
+        if number in (3, 6):
+            engine.split()
+            journal.append(TODAY, project, engine.take_intervals())
+            expected[project] = expected.get(project, 0) + clock.now - started
+            project, started = f"Project {number}", clock.now
+        end = clock.now + 3600
+        while clock.now < end:
+            clock.now += rng.choice([1.0, 1.0, 1.3, 2.0, 5.0])
+            engine.tick()
+        if number == 2:
+            clock.now += 1800
+            engine.tick()
+            engine.keep_gap()
+        if number == 4:
+            gap_start = clock.now
+            clock.now += 7200
+            engine.tick()
+            engine.discard_gap()
+            started += clock.now - gap_start
+    engine.stop()
+    journal.append(TODAY, project, engine.take_intervals())
+    expected[project] = expected.get(project, 0) + clock.now - started
+
+    replayed = {name: seconds for (date, name), seconds in journal.replay().items()}
+    # intervals are whole seconds, the discarded suspend split one in two
+    assert sum(replayed.values()) == engine.elapsed()
+    assert replayed.keys() == expected.keys()
+    assert all(abs(replayed[name] - expected[name]) < 2 for name in expected)
+
+
+def test_journal_skips_torn_lines(tmp_path):
+    journal = IntervalJournal(str(tmp_path))
+    journal.append(TODAY, "Default", [(1000.0, 60)])
+    journal.append(TODAY, "Default", [])
+    with open(journal.path, "a") as f:
+        f.write('{"date": "2024-01-31", "proj')
+    assert journal.replay() == {(TODAY, "Default"): 60}
+    assert IntervalJournal(str(tmp_path), "missing.journal").replay() == {}
@@ -0,0 +1,107 @@
+import datetime
+
+import pytest
+from PyQt5.QtCore import Qt
+
+from tests.helpers import RecordingStorage
+from timesheet_model import DAY, MONTH_TOTAL, WEEK_TOTAL, RangeModel
+from timesheet_store import TimesheetStore
+
+# Monday 29 January to Tuesday 6 February 2024
+FIRST, LAST = datetime.date(2024, 1, 29), datetime.date(2024, 2, 6)
+
+
+def date(month, number):
+    return datetime.date(2024, month, number)
+
+
+@pytest.fixture
+def store():
+    return TimesheetStore(RecordingStorage())
+
+
+@pytest.fixture
+def model(qapp, store):
+    return RangeModel(store, FIRST, LAST, "Default", (2024, 2, 1), [5, 6])
+
+
+def text(model, row, column=1):
+    return model.data(model.index(row, column))
+
+
+def test_rows_are_days_followed_by_their_subtotals(model):
+    rows = [(datetime.date.fromordinal(ordinal), kind) for ordinal, kind in (divmod(row, 4) for row in model.rows)]
+    assert rows == [
+        (date(1, 29), DAY),
+        (date(1, 30), DAY),
+        (date(1, 31), DAY),
+        (date(1, 31), MONTH_TOTAL),
+        (date(2, 1), DAY),
+        (date(2, 2), DAY),
+        (date(2, 3), DAY),
+        (date(2, 4), DAY),
+        (date(2, 4), WEEK_TOTAL),
+        (date(2, 5), DAY),
+        (date(2, 6), DAY),
+        # the range ends mid-week and mid-month
+        (date(2, 6), WEEK_TOTAL),
+        (date(2, 6), MONTH_TOTAL),
+    ]
+    assert model.rowCount() == 13
+    assert [text(model, row, 0) for row in (3, 8)] == ["January 2024", "Week 2024-W05"]
+
+
+def test_row_of_and_day_of_row(model):
+    assert model.row_of(date(2, 1)) == 4
+    assert model.row_of(date(2, 4), WEEK_TOTAL) == 8
+    assert model.row_of(date(2, 1), WEEK_TOTAL) is None
+    assert model.row_of(date(2, 7)) is None
+    assert model.today_row() == 4
+    assert model.day_of_row(4) == (2024, 2, 0)
+    assert model.day_of_row(0) == (2024, 1, 28)
+    assert model.day_of_row(3) is None
+    assert model.day_of_row(8) is None
+
+
+def test_subtotals_only_count_days_in_the_range(qapp, store):
+    for day in range(31):
+        store.set_seconds(2024, 1, day, 3600)
+    # Wednesday 3 to Sunday 7 January
+    model = RangeModel(store, date(1, 3), date(1, 7), "Default", (2024, 1, 1), [5, 6])
+    assert text(model, model.row_of(date(1, 7), WEEK_TOTAL)) == "005:00:00"
+    assert text(model, model.row_of(date(1, 7), MONTH_TOTAL)) == "005:00:00"
+
+
+def test_edit_refreshes_the_day_and_its_subtotals(model, store):
+    changed = []
+    edited = []
+    model.dataChanged.connect(lambda first, last: changed.append((first.row(), first.column())))
+    model.edited.connect(lambda row, column: edited.append((row, column)))
+    store.set_seconds(2024, 1, 30, 3600)
+
+    assert model.setData(model.index(4, 1), "2h", Qt.EditRole)
+    assert store.sheet(2024, 2).project_seconds("Default", 0) == 7200
+    assert changed == [(4, 1), (4, 2), (8, 1), (12, 1)]
+    assert edited == [(4, 1)]
+    # the week runs from 29 January, the month total starts on 1 February
+    assert text(model, 8) == "003:00:00"
+    assert text(model, 12) == "002:00:00"
+    assert text(model, 3) == "001:00:00"
+
+    # the last day of the range is in the subtotals that end on it
+    changed.clear()
+    model.refresh_row(10)
+    assert changed == [(10, 1), (10, 2), (11, 1), (12, 1)]
+
+
+def test_set_data_parses_entries(model, store):
+    assert not model.setData(model.index(4, 1), "soon", Qt.EditRole)
+    assert model.setData(model.index(4, 1), "30h", Qt.EditRole)
+    assert store.sheet(2024, 2).project_seconds("Default", 0) == 24 * 3600
+    assert text(model, 4) == "24:00:00"
+    assert model.setData(model.index(4, 2), "review", Qt.EditRole)
+    assert text(model, 4, 2) == "review"
+    # dates and subtotals can't be edited
+    assert not model.setData(model.index(4, 0), "x", Qt.EditRole)
+    assert not model.setData(model.index(8, 1), "1h", Qt.EditRole)
+    assert not model.flags(model.index(8, 1)) & Qt.ItemIsEditable
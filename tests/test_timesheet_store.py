@@ -0,0 +1,101 @@
+import pytest
+
+from durations import MAX_ENTRY, parse_entry
+from storage import JsonStorage
+from tests.helpers import RecordingStorage
+from timesheet_store import MonthSheet, TimesheetStore
+
+
+LEGACY_DAY = {"time_worked": "02:30:00", "notes": "legacy"}
+PROJECTS_DAY = {
+    "time_worked": "03:00:00",
+    "notes": "default notes",
+    "projects": {
+        "Default": {"time_worked": "01:00:00", "notes": "default notes"},
+        "Client X": {"time_worked": "02:00:00", "notes": "client"},
+    },
+}
+
+
+def test_month_sheet_round_trips_both_day_formats():
+    data = {"01/03/2024": LEGACY_DAY, "15/03/2024": PROJECTS_DAY}
+    sheet = MonthSheet(2024, 3)
+    sheet.load(data)
+    assert sheet.to_dict() == data
+    assert sheet.seconds[0] == 9000
+    assert sheet.seconds[14] == 3 * 3600
+    assert sheet.project_seconds("Client X", 14) == 2 * 3600
+    assert sheet.project_notes("Default", 0) == "legacy"
+
+
+def test_month_sheet_ignores_dates_outside_the_month():
+    sheet = MonthSheet(2023, 2)
+    sheet.load({"30/02/2023": LEGACY_DAY})
+    assert sheet.to_dict() == {}
+    assert sheet.total() == 0
+
+
+def test_set_seconds_and_set_notes_mark_days_dirty():
+    store = TimesheetStore(RecordingStorage())
+    store.set_seconds(2024, 3, 4, 3600)
+    store.set_notes(2024, 3, 9, "notes")
+    sheet = store.sheet(2024, 3)
+    assert sheet.dirty == {4, 9}
+    assert sheet.seconds[4] == 3600
+
+
+def test_unchanged_values_are_not_dirty():
+    storage = RecordingStorage({(2024, 3): {"01/03/2024": LEGACY_DAY}})
+    store = TimesheetStore(storage)
+    store.set_seconds(2024, 3, 0, 9000)
+    store.set_notes(2024, 3, 0, "legacy")
+    assert store.sheet(2024, 3).dirty == set()
+
+
+def test_save_records_only_changed_days():
+    storage = RecordingStorage({(2024, 3): {"01/03/2024": LEGACY_DAY, "15/03/2024": PROJECTS_DAY}})
+    store = TimesheetStore(storage)
+    store.set_seconds(2024, 3, 1, 60)
+    store.set_notes(2024, 3, 14, "changed", "Client X")
+    saved = []
+    store.save_listeners.append(saved.append)
+    store.save()
+    assert storage.recorded == [(2024, 3, "02/03/2024"), (2024, 3, "15/03/2024")]
+    assert storage.months[(2024, 3)]["15/03/2024"]["projects"]["Client X"]["notes"] == "changed"
+    assert store.sheet(2024, 3).dirty == set()
+    assert [sheet.month for sheet in saved] == [3]
+
+    store.save()
+    assert len(storage.recorded) == 2
+
+
+def test_cleared_day_is_removed_from_storage(tmp_path):
+    storage = JsonStorage(str(tmp_path))
+    store = TimesheetStore(storage)
+    store.set_seconds(2024, 3, 0, 3600)
+    store.save()
+    store.set_seconds(2024, 3, 0, 0)
+    store.save()
+    storage.close()
+    assert JsonStorage(str(tmp_path)).read_month(2024, 3) == {}
+
+
+@pytest.mark.parametrize(
+    "text, seconds",
+    [
+        ("", 0),
+        ("   ", 0),
+        ("90s", 90),
+        ("45m", 45 * 60),
+        ("2h", 2 * 3600),
+        ("25h", MAX_ENTRY),
+        ("01:30:15", 5415),
+        ("30:00:00", MAX_ENTRY),
+        ("abc", None),
+        ("h", None),
+        ("1:2", None),
+        ("-5m", None),
+    ],
+)
+def test_parse_entry(text, seconds):
+    assert parse_entry(text) == seconds
@@ -0,0 +1,124 @@
+import datetime
+import json
+import os
+import time
+
+
+if hasattr(time, "CLOCK_BOOTTIME"):
+
+    def boot_clock():
+        # like time.monotonic, but keeps counting while the computer is suspended
+        return time.clock_gettime(time.CLOCK_BOOTTIME)
+
+else:
+    boot_clock = time.monotonic
+
+
+class TimerEngine:
+    # Elapsed time is measured against a monotonic clock instead of counting
+    # ticks, so a late or dropped QTimer timeout doesn't lose any time. The
+    # timer runs in intervals of whole seconds between start() and stop();
+    # finished intervals are collected in self.intervals as (wall clock start,
+    # seconds) until they are taken for the interval journal. tick() is only
+    # used to notice gaps, e.g. a suspend, that the user may want to discard.
+    def __init__(self, clock=boot_clock, wall_clock=time.time):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.base = 0
+        self.started_at = None
+        self.started_wall = None
+        self.last_tick = None
+        self.gap_start = None
+        self.intervals = []
+
+    def is_running(self):
+        return self.started_at is not None
+
+    def start(self):
+        if self.started_at is None:
+            self.started_at = self.last_tick = self.clock()
+            self.started_wall = self.wall_clock()
+
+    def stop(self):
+        if self.started_at is not None:
+            self.end_interval(self.clock())
+            self.started_at = None
+
+    def end_interval(self, end):
+        seconds = max(int(end - self.started_at), 0)
+        self.base += seconds
+        if seconds:
+            self.intervals.append((self.started_wall, seconds))
+
+    def split(self):
+        # end the running interval and start the next one at the same time,
+        # e.g. when the timer switches to another project
+        if self.started_at is not None:
+            now = self.clock()
+            self.end_interval(now)
+            self.started_at = self.last_tick = now
+            self.started_wall = self.wall_clock()
+
+    def take_intervals(self):
+        intervals, self.intervals = self.intervals, []
+        return intervals
+
+    def elapsed(self):
+        if self.started_at is None:
+            return self.base
+        return self.base + max(int(self.clock() - self.started_at), 0)
+
+    def set_elapsed(self, seconds):
+        self.split()
+        self.base = seconds
+
+    def tick(self):
+        # seconds since the previous tick, or since the timer was started
+        now = self.clock()
+        self.gap_start = self.last_tick
+        self.last_tick = now
+        return now - self.gap_start
+
+    def keep_gap(self):
+        # count the gap; the next tick is measured from now, not from before
+        # the user was asked about it
+        self.last_tick = self.clock()
+
+    def discard_gap(self):
+        # don't count the time since the tick before the last one, up to now
+        if self.started_at is not None and self.gap_start is not None:
+            self.end_interval(max(self.gap_start, self.started_at))
+            self.started_at = self.last_tick = self.clock()
+            self.started_wall = self.wall_clock()
+
+
+class IntervalJournal:
+    # The timer's intervals, one JSON line each, e.g.
+    #   {"date": "2024-01-31", "project": "Default", "start": 1706688000.0, "seconds": 3600}
+    # Replaying it gives the time the timer measured per day and project.
+    def __init__(self, directory=".", filename="timer-intervals.journal"):
+        self.path = os.path.join(directory, filename)
+
+    def append(self, date, project, intervals):
+        if not intervals:
+            return
+        lines = [
+            json.dumps({"date": date.isoformat(), "project": project, "start": start, "seconds": seconds}) + "\n"
+            for start, seconds in intervals
+        ]
+        with open(self.path, "a") as f:
+            f.write("".join(lines))
+
+    def replay(self):
+        # {(date, project): seconds}
+        totals = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write
+                    key = (datetime.date.fromisoformat(record["date"]), record["project"])
+                    totals[key] = totals.get(key, 0) + record["seconds"]
+        return totals
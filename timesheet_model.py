@@ -0,0 +1,285 @@
+import datetime
+from array import array
+from bisect import bisect_left
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont
+
+from durations import format_duration, parse_entry
+
+
+def format_total(seconds):
+    return "{:03d}:{:02d}:{:02d}".format(seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+class TimesheetModel(QAbstractTableModel):
+    # Table view of one project's month in the TimesheetStore: a row per day
+    # and a "Total Worked Hours" row at the bottom. Cell text is computed on
+    # demand.
+    edited = pyqtSignal(int, int)
+
+    headers = ["Date", "Time Worked", "Notes"]
+
+    def __init__(self, store, year, month, project, today, weekend_days):
+        super().__init__()
+        self.store = store
+        self.project = project
+        self.today = today
+        self.weekend_days = weekend_days
+        self.sheet = store.sheet(year, month)
+
+    def set_month(self, year, month):
+        self.beginResetModel()
+        self.sheet = self.store.sheet(year, month)
+        self.endResetModel()
+
+    def set_project(self, project):
+        self.beginResetModel()
+        self.project = project
+        self.endResetModel()
+
+    def set_weekend_days(self, weekend_days):
+        self.weekend_days = weekend_days
+        self.dataChanged.emit(self.index(0, 0), self.index(self.sheet.days - 1, 2))
+
+    def today_row(self):
+        year, month, day = self.today
+        if (self.sheet.year, self.sheet.month) == (year, month):
+            return day - 1
+        return None
+
+    def row_of(self, date):
+        if (self.sheet.year, self.sheet.month) == (date.year, date.month):
+            return date.day - 1
+        return None
+
+    def day_of_row(self, row):
+        # (year, month, day index) of a day row, None for the total
+        if row < self.sheet.days:
+            return self.sheet.year, self.sheet.month, row
+        return None
+
+    def total_row(self):
+        return self.sheet.days
+
+    def refresh_row(self, row):
+        # one cell at a time, views repaint everything for a larger range
+        for column in (1, 2):
+            self.dataChanged.emit(self.index(row, column), self.index(row, column))
+        total = self.total_row()
+        self.dataChanged.emit(self.index(total, 1), self.index(total, 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.sheet.days + 1
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row, column = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if row == self.total_row():
+                if column == 0:
+                    return "Total Worked Hours"
+                if column == 1:
+                    return format_total(
+                        self.store.project_month_total(self.project, self.sheet.year, self.sheet.month)
+                    )
+                return ""
+            if column == 0:
+                return self.sheet.date(row)
+            if column == 1:
+                return format_duration(self.sheet.project_seconds(self.project, row))
+            return self.sheet.project_notes(self.project, row)
+        if role == Qt.BackgroundRole and row != self.total_row():
+            if row == self.today_row():
+                # rbg dark green for modern design and dark mode: (0, 128, 0)
+                return QColor(0, 100, 0)
+            if self.sheet.weekday(row) in self.weekend_days:
+                return QColor(Qt.darkGray)
+        return None
+
+    def flags(self, index):
+        if index.column() == 0 or index.row() == self.total_row():
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not self.flags(index) & Qt.ItemIsEditable:
+            return False
+        row, column = index.row(), index.column()
+        year, month = self.sheet.year, self.sheet.month
+        if column == 1:
+            seconds = parse_entry(value)
+            if seconds is None:
+                return False
+            self.store.set_seconds(year, month, row, seconds, self.project)
+        else:
+            self.store.set_notes(year, month, row, value, self.project)
+        self.refresh_row(row)
+        self.edited.emit(row, column)
+        return True
+
+
+DAY, WEEK_TOTAL, MONTH_TOTAL = range(3)
+
+
+class RangeModel(QAbstractTableModel):
+    # Table view of one project over any span of days, with a subtotal row
+    # after every week and every month. Rows are kept as one integer each,
+    # 4 * date ordinal + row kind, which sorts days before the subtotals that
+    # close on them. Cells are computed on demand and months are loaded from
+    # the store only when one of their rows is shown.
+    edited = pyqtSignal(int, int)
+
+    headers = TimesheetModel.headers
+
+    def __init__(self, store, first, last, project, today, weekend_days):
+        super().__init__()
+        self.store = store
+        self.project = project
+        self.today = today
+        self.weekend_days = weekend_days
+        self.rows = array("l")
+        self.build_rows(first, last)
+
+    def build_rows(self, first, last):
+        self.first, self.last = first, last
+        self.rows = array("l")
+        for ordinal in range(first.toordinal(), last.toordinal() + 1):
+            self.rows.append(4 * ordinal + DAY)
+            date = datetime.date.fromordinal(ordinal)
+            if date.weekday() == 6 or date == last:
+                self.rows.append(4 * ordinal + WEEK_TOTAL)
+            if (date + datetime.timedelta(days=1)).day == 1 or date == last:
+                self.rows.append(4 * ordinal + MONTH_TOTAL)
+
+    def set_range(self, first, last):
+        self.beginResetModel()
+        self.build_rows(first, last)
+        self.endResetModel()
+
+    def set_project(self, project):
+        self.beginResetModel()
+        self.project = project
+        self.endResetModel()
+
+    def set_weekend_days(self, weekend_days):
+        self.weekend_days = weekend_days
+        self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, 2))
+
+    def row_of(self, date, kind=DAY):
+        row = bisect_left(self.rows, 4 * date.toordinal() + kind)
+        if row < len(self.rows) and self.rows[row] == 4 * date.toordinal() + kind:
+            return row
+        return None
+
+    def today_row(self):
+        return self.row_of(datetime.date(*self.today))
+
+    def day_of_row(self, row):
+        # (year, month, day index) of a day row, None for subtotals
+        ordinal, kind = divmod(self.rows[row], 4)
+        if kind != DAY:
+            return None
+        date = datetime.date.fromordinal(ordinal)
+        return date.year, date.month, date.day - 1
+
+    def refresh_row(self, row):
+        # the day and the subtotals that include it, one cell at a time
+        for column in (1, 2):
+            self.dataChanged.emit(self.index(row, column), self.index(row, column))
+        date = datetime.date.fromordinal(self.rows[row] // 4)
+        sunday = min(date + datetime.timedelta(days=6 - date.weekday()), self.last)
+        month_end = datetime.date(date.year + date.month // 12, date.month % 12 + 1, 1) - datetime.timedelta(days=1)
+        for total in (self.row_of(sunday, WEEK_TOTAL), self.row_of(min(month_end, self.last), MONTH_TOTAL)):
+            self.dataChanged.emit(self.index(total, 1), self.index(total, 1))
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def seconds_between(self, first, last):
+        total = 0
+        for ordinal in range(max(first, self.first).toordinal(), last.toordinal() + 1):
+            date = datetime.date.fromordinal(ordinal)
+            total += self.store.sheet(date.year, date.month).project_seconds(self.project, date.day - 1)
+        return total
+
+    def data(self, index, role=Qt.DisplayRole):
+        row, column = index.row(), index.column()
+        ordinal, kind = divmod(self.rows[row], 4)
+        date = datetime.date.fromordinal(ordinal)
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if kind == WEEK_TOTAL:
+                if column == 0:
+                    iso_year, week, _ = date.isocalendar()
+                    return f"Week {iso_year}-W{week:02d}"
+                if column == 1:
+                    return format_total(self.seconds_between(date - datetime.timedelta(days=date.weekday()), date))
+                return ""
+            if kind == MONTH_TOTAL:
+                if column == 0:
+                    return date.strftime("%B %Y")
+                if column == 1:
+                    return format_total(self.seconds_between(date.replace(day=1), date))
+                return ""
+            sheet = self.store.sheet(date.year, date.month)
+            if column == 0:
+                return sheet.date(date.day - 1)
+            if column == 1:
+                return format_duration(sheet.project_seconds(self.project, date.day - 1))
+            return sheet.project_notes(self.project, date.day - 1)
+        if role == Qt.BackgroundRole:
+            if kind != DAY:
+                return QColor(Qt.gray)
+            if date == datetime.date(*self.today):
+                return QColor(0, 100, 0)
+            if date.weekday() in self.weekend_days:
+                return QColor(Qt.darkGray)
+        if role == Qt.FontRole and kind != DAY:
+            font = QFont()
+            font.setBold(True)
+            return font
+        return None
+
+    def flags(self, index):
+        if index.column() == 0 or self.rows[index.row()] % 4 != DAY:
+            return Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.EditRole or not self.flags(index) & Qt.ItemIsEditable:
+            return False
+        row, column = index.row(), index.column()
+        year, month, day = self.day_of_row(row)
+        if column == 1:
+            seconds = parse_entry(value)
+            if seconds is None:
+                return False
+            self.store.set_seconds(year, month, day, seconds, self.project)
+        else:
+            self.store.set_notes(year, month, day, value, self.project)
+        self.refresh_row(row)
+        self.edited.emit(row, column)
+        return True
@@ -0,0 +1,245 @@
+import calendar
+import datetime
+from array import array
+from collections import OrderedDict
+
+from storage import DEFAULT_PROJECT, day_entries, make_day
+
+
+def date_key(year, month, day):
+    # dates are stored as "dd/MM/yyyy" in the month files
+    return f"{day:02d}/{month:02d}/{year}"
+
+
+class ProjectDays:
+    # seconds and notes per day of one project in one month
+    def __init__(self, days):
+        self.seconds = array("l", [0] * days)
+        self.notes = [""] * days
+
+
+class MonthSheet:
+    # One month as a compact array of seconds per day over all projects, plus
+    # the seconds and notes of each project that has entries in the month.
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        self.first_weekday, self.days = calendar.monthrange(year, month)
+        self.seconds = array("l", [0] * self.days)
+        self.projects = {}
+        self.dirty = set()
+        first = datetime.date(year, month, 1).toordinal()
+        self.weeks = [datetime.date.fromordinal(first + index).isocalendar()[:2] for index in range(self.days)]
+        self.dates = [date_key(year, month, index + 1) for index in range(self.days)]
+
+    def date(self, index):
+        return self.dates[index]
+
+    def weekday(self, index):
+        # 0 is Monday, like the weekend_days setting
+        return (self.first_weekday + index) % 7
+
+    def project(self, name):
+        if name not in self.projects:
+            self.projects[name] = ProjectDays(self.days)
+        return self.projects[name]
+
+    def project_seconds(self, name, index):
+        project = self.projects.get(name)
+        return project.seconds[index] if project is not None else 0
+
+    def project_notes(self, name, index):
+        project = self.projects.get(name)
+        return project.notes[index] if project is not None else ""
+
+    def total_keys(self, index, project):
+        # the running totals a day's entry for a project counts towards
+        iso_year, week = self.weeks[index]
+        return (
+            ("week", iso_year, week),
+            ("month", self.year, self.month),
+            ("year", self.year),
+            ("project", project),
+            ("project month", project, self.year, self.month),
+        )
+
+    def total(self):
+        return sum(self.seconds)
+
+    def project_totals(self):
+        return {name: sum(project.seconds) for name, project in self.projects.items()}
+
+    def load(self, data):
+        for date, day in data.items():
+            index = int(date[:2]) - 1
+            if 0 <= index < self.days:
+                for name, (seconds, notes) in day_entries(day).items():
+                    project = self.project(name)
+                    project.seconds[index] = seconds
+                    project.notes[index] = notes
+                    self.seconds[index] += seconds
+
+    def day_data(self, index):
+        entries = {}
+        for name, project in self.projects.items():
+            if project.seconds[index] or project.notes[index]:
+                entries[name] = (project.seconds[index], project.notes[index])
+        return make_day(entries)
+
+    def to_dict(self):
+        data = {}
+        for index in range(self.days):
+            day = self.day_data(index)
+            if day is not None:
+                data[self.date(index)] = day
+        return data
+
+
+class TimesheetStore:
+    # In-memory model of the timesheet, independent of Qt. Months are loaded
+    # from the storage backend on first use and only changed days are saved.
+    # Week, month and year totals, and totals per project, of the loaded months
+    # are kept up to date on every change; with check_totals they are verified
+    # against a recompute.
+    #
+    # At most cache_size months are kept (all of them when None), dropping the
+    # least recently used ones that have no unsaved changes and aren't pinned.
+    # The totals still count a dropped month; its seconds per project are kept
+    # so that they can be replaced when the month is loaded again.
+    def __init__(self, storage, check_totals=False, cache_size=None):
+        self.storage = storage
+        self.check_totals = check_totals
+        self.cache_size = cache_size
+        self.sheets = OrderedDict()
+        self.evicted = {}
+        self.pinned = set()
+        self.totals = {}
+        # called with every month sheet that had changes saved or was reloaded
+        self.save_listeners = []
+
+    def sheet(self, year, month):
+        sheet = self.sheets.get((year, month))
+        if sheet is not None:
+            self.sheets.move_to_end((year, month))
+            return sheet
+        if (year, month) in self.evicted:
+            return self.reload(year, month)
+        sheet = MonthSheet(year, month)
+        sheet.load(self.storage.load_month(year, month))
+        self.add_sheet(sheet)
+        return sheet
+
+    def reload(self, year, month):
+        # replace what the totals counted for the month by what is stored now
+        counted = self.evicted.pop((year, month), None)
+        previous = self.sheets.pop((year, month), None)
+        if previous is not None:
+            counted = {name: project.seconds for name, project in previous.projects.items()}
+        sheet = MonthSheet(year, month)
+        sheet.load(self.storage.load_month(year, month))
+        for name, seconds in (counted or {}).items():
+            self.add_days_to_totals(sheet, name, seconds, -1)
+        self.add_sheet(sheet)
+        return sheet
+
+    def refresh(self, year, month):
+        # reload a month that was changed in storage by another instance or
+        # the command line since it was loaded, True if it was
+        sheet = self.sheets.get((year, month))
+        if sheet is None or sheet.dirty or not self.storage.month_changed(year, month):
+            return False
+        sheet = self.reload(year, month)
+        for listener in self.save_listeners:
+            listener(sheet)
+        return True
+
+    def add_sheet(self, sheet):
+        self.sheets[(sheet.year, sheet.month)] = sheet
+        for name, project in sheet.projects.items():
+            self.add_days_to_totals(sheet, name, project.seconds, 1)
+        self.evict()
+        if self.check_totals:
+            self.verify_totals()
+
+    def evict(self):
+        if self.cache_size is None:
+            return
+        for key in list(self.sheets)[:-1]:
+            if len(self.sheets) <= self.cache_size:
+                break
+            sheet = self.sheets[key]
+            if key in self.pinned or sheet.dirty:
+                continue
+            del self.sheets[key]
+            self.evicted[key] = {name: project.seconds for name, project in sheet.projects.items()}
+
+    def add_days_to_totals(self, sheet, project, seconds, sign):
+        for index in range(sheet.days):
+            if seconds[index]:
+                self.add_to_totals(sheet, index, project, sign * seconds[index])
+
+    def add_to_totals(self, sheet, index, project, seconds):
+        for key in sheet.total_keys(index, project):
+            self.totals[key] = self.totals.get(key, 0) + seconds
+
+    def week_total(self, iso_year, week):
+        return self.totals.get(("week", iso_year, week), 0)
+
+    def month_total(self, year, month):
+        return self.totals.get(("month", year, month), 0)
+
+    def year_total(self, year):
+        return self.totals.get(("year", year), 0)
+
+    def project_total(self, project):
+        return self.totals.get(("project", project), 0)
+
+    def project_month_total(self, project, year, month):
+        return self.totals.get(("project month", project, year, month), 0)
+
+    def verify_totals(self):
+        expected = {}
+        counted = [
+            (sheet, {name: project.seconds for name, project in sheet.projects.items()})
+            for sheet in self.sheets.values()
+        ]
+        counted += [(MonthSheet(year, month), projects) for (year, month), projects in self.evicted.items()]
+        for sheet, projects in counted:
+            for name, seconds in projects.items():
+                for index in range(sheet.days):
+                    for key in sheet.total_keys(index, name):
+                        expected[key] = expected.get(key, 0) + seconds[index]
+        for key in set(expected) | set(self.totals):
+            if expected.get(key, 0) != self.totals.get(key, 0):
+                raise AssertionError(
+                    f"{key} total is {self.totals.get(key, 0)}, recomputed {expected.get(key, 0)}"
+                )
+
+    def set_seconds(self, year, month, index, seconds, project=DEFAULT_PROJECT):
+        sheet = self.sheet(year, month)
+        days = sheet.project(project)
+        if days.seconds[index] != seconds:
+            delta = seconds - days.seconds[index]
+            self.add_to_totals(sheet, index, project, delta)
+            days.seconds[index] = seconds
+            sheet.seconds[index] += delta
+            sheet.dirty.add(index)
+            if self.check_totals:
+                self.verify_totals()
+
+    def set_notes(self, year, month, index, notes, project=DEFAULT_PROJECT):
+        sheet = self.sheet(year, month)
+        days = sheet.project(project)
+        if days.notes[index] != notes:
+            days.notes[index] = notes
+            sheet.dirty.add(index)
+
+    def save(self):
+        for (year, month), sheet in self.sheets.items():
+            if not sheet.dirty:
+                continue
+            for index in sorted(sheet.dirty):
+                self.storage.record(year, month, sheet.date(index), sheet.day_data(index))
+            sheet.dirty.clear()
+            for listener in self.save_listeners:
+                listener(sheet)